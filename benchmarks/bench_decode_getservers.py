@@ -0,0 +1,79 @@
+"""
+Microbenchmark of getserversResponse decoding, comparing the per-record struct.unpack decoder that
+ETClientProtocol.decode_getserversResponse used to be against the current batch decoder.
+
+Usage: python -m benchmarks.bench_decode_getservers
+"""
+import random
+import struct
+import timeit
+
+from et_discord_bot.etwolf_client import ETClientProtocol
+from et_discord_bot.hosttable import unpack_address
+from et_discord_bot.test_etwolf_client import GETSERVERS_RESPONSE_PACKETS
+from et_discord_bot.util import split_chunks
+
+SYNTHETIC_SERVER_COUNT = 20000
+SYNTHETIC_RECORDS_PER_PACKET = 200  # ~1.4KB datagrams, like the real master servers send.
+
+
+def legacy_decode_getserversResponse(data):
+    data = data[4:]
+    servers = []
+    servers_data = data[data.find(b'\\'):data.rfind(b'\\')]
+    for server_raw in split_chunks(servers_data, 7):
+        unpacked_ip_and_port = struct.unpack('!BBBBH', server_raw[1:])
+        ip = '.'.join(map(str, unpacked_ip_and_port[:-1]))
+        port = int(unpacked_ip_and_port[-1])
+        servers.append((ip, port))
+    return servers
+
+
+def legacy_merge(packets):
+    servers = []
+    for packet in packets:
+        servers.extend(legacy_decode_getserversResponse(packet))
+    return list(set(servers))
+
+
+def batch_merge(protocol, packets):
+    addresses = set()
+    for packet in packets:
+        addresses.update(protocol.decode_getserversResponse(packet))
+    return addresses
+
+
+def synthetic_packets(server_count, records_per_packet):
+    rng = random.Random(0)
+    records = [
+        b'\\' + struct.pack('!IH', rng.getrandbits(32), rng.randrange(27960, 27990))
+        for _ in range(server_count)
+    ]
+    return [
+        b'\xff\xff\xff\xffgetserversResponse' + b''.join(records[i:i + records_per_packet]) + b'\\EOT\0\0\0'
+        for i in range(0, len(records), records_per_packet)
+    ]
+
+
+def bench(name, packets, number):
+    protocol = ETClientProtocol(loop=None, rate_limiter=None)
+
+    legacy = sorted(legacy_merge(packets))
+    batch = sorted(unpack_address(address) for address in batch_merge(protocol, packets))
+    assert(legacy == batch)
+
+    legacy_time = timeit.timeit(lambda: legacy_merge(packets), number=number) / number
+    batch_time = timeit.timeit(lambda: batch_merge(protocol, packets), number=number) / number
+    print(f'{name}: {len(batch)} servers in {len(packets)} packets')
+    print(f'  legacy: {legacy_time * 1e3:8.3f} ms/list ({len(batch) / legacy_time:12,.0f} servers/s)')
+    print(f'  batch:  {batch_time * 1e3:8.3f} ms/list ({len(batch) / batch_time:12,.0f} servers/s)'
+          f'  {legacy_time / batch_time:.1f}x')
+
+
+def main():
+    bench('fixture', GETSERVERS_RESPONSE_PACKETS, number=2000)
+    bench('synthetic', synthetic_packets(SYNTHETIC_SERVER_COUNT, SYNTHETIC_RECORDS_PER_PACKET), number=20)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark of infoResponse parsing, comparing the dict-building decoder ETClientProtocol.decode_infoResponse used to be
+(with its unconditional json.dumps debug dump) against the ServerInfo parser.
+
+Usage: python -m benchmarks.bench_decode_inforesponse
+"""
+import json
+import logging
+import re
+import timeit
+
+from et_discord_bot.etwolf_client import ETClientProtocol
+from et_discord_bot.test_etwolf_client import GETINFO_RESPONSE
+
+
+def legacy_decode_dict(raw):
+    value = dict()
+    raw_list = raw[1:].split('\\')
+    for i in range(0, len(raw_list), 2):
+        value[raw_list[i]] = raw_list[i + 1]
+    return value
+
+
+def legacy_decode_infoResponse(data):
+    message_parts = data.decode('UTF8', 'replace').split('\n')
+    host_info = legacy_decode_dict(message_parts[1])
+
+    host_info['hostname_plaintext'] = re.sub(r'\^.', '', host_info['hostname'])
+    logging.debug(json.dumps(host_info, indent=4, sort_keys=True))
+
+    host_info['players'] = []
+    for player_info_raw in message_parts[2:]:
+        player_info_dict = re.match(r'(?P<score>\d+) (?P<ping>\d+) "(?P<name>.+)"', player_info_raw).groupdict()
+        host_info['players'].append(player_info_dict)
+
+    return host_info
+
+
+def main():
+    protocol = ETClientProtocol(loop=None, rate_limiter=None)
+    data = GETINFO_RESPONSE[4:]
+
+    legacy = legacy_decode_infoResponse(data)
+    assert(protocol.decode_infoResponse(data).to_dict() == legacy)
+
+    number = 50000
+    legacy_time = timeit.timeit(lambda: legacy_decode_infoResponse(data), number=number) / number
+    new_time = timeit.timeit(lambda: protocol.decode_infoResponse(data), number=number) / number
+    print(f'legacy:     {1 / legacy_time:10,.0f} responses/s')
+    print(f'ServerInfo: {1 / new_time:10,.0f} responses/s  {legacy_time / new_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+End to end load benchmark against a simulated fleet (see fleet.py): a fake master listing thousands of fake ET servers
+on loopback, all in this process.
+
+The client scenario fetches the server list with ETClient and probes every server once. The bot scenario runs
+ETBot._query_server_list and a full ETBot._poll_due_hosts sweep, with the Discord client stubbed out, so it needs
+discord.py installed. Results are printed as JSON, for tracking regressions.
+
+Usage: python -m benchmarks.bench_fleet [--servers 2000] [--rtt-ms 20] [--loss 0.01] [--dead-fraction 0.05] ...
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from benchmarks.fleet import Fleet
+from et_discord_bot.etwolf_client import ETClient
+from et_discord_bot.ratelimit import TokenBucketRateLimiter
+
+FD_SAMPLE_INTERVAL = 0.05
+
+
+class ProbeRecorder(object):
+    """
+    Wraps an ETClient's get_server_info, timing every probe, and samples the process's open FD count meanwhile.
+    """
+
+    def __init__(self, client, loop):
+        self.latencies = []
+        self.failures = 0
+        self.peak_fds = _fd_count()
+        self._loop = loop
+        self._get_server_info = client.get_server_info
+        client.get_server_info = self._timed_get_server_info
+        self._fd_task = loop.create_task(self._sample_fds())
+
+    def close(self):
+        self._fd_task.cancel()
+
+    async def _timed_get_server_info(self, *args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            host_info = await self._get_server_info(*args, **kwargs)
+        except Exception:
+            self.failures += 1
+            raise
+        self.latencies.append(time.perf_counter() - started_at)
+        return host_info
+
+    async def _sample_fds(self):
+        while True:
+            self.peak_fds = max(self.peak_fds, _fd_count())
+            await asyncio.sleep(FD_SAMPLE_INTERVAL)
+
+    def results(self, fleet_fds):
+        latencies = sorted(self.latencies)
+        return {
+            'probes_ok': len(latencies),
+            'probes_failed': self.failures,
+            'probe_latency_p50_ms': _percentile(latencies, 0.50) * 1000,
+            'probe_latency_p99_ms': _percentile(latencies, 0.99) * 1000,
+            'peak_client_fds': self.peak_fds - fleet_fds,
+        }
+
+
+async def run_client_scenario(loop, fleet, args, fleet_fds):
+    client = ETClient(loop, capture_path=args.capture)
+    client.MASTER_SERVERS = [fleet.master_addr]
+    client.rate_limiter = TokenBucketRateLimiter(64 * 1024 * 1024, args.packet_rate, loop=loop)
+    recorder = ProbeRecorder(client, loop)
+    try:
+        started_at = time.perf_counter()
+        servers = await client.get_server_list()
+        list_time = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(client.get_server_info(ip, port) for ip, port in servers), return_exceptions=True)
+        sweep_time = time.perf_counter() - started_at
+    finally:
+        recorder.close()
+        client.close()
+
+    return {
+        'servers_listed': len(servers),
+        'server_list_wall_time_s': list_time,
+        'sweep_wall_time_s': sweep_time,
+        'packets_sent': client.rate_limiter.sent_packets,
+        **recorder.results(fleet_fds),
+    }
+
+
+async def run_bot_scenario(loop, fleet, args, fleet_fds, work_dir):
+    # config is loaded on import, so point it at a generated config first.
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w') as config_file:
+        json.dump({
+            'bot_administrator': 'bench',
+            'status_output_channel': 0,
+            'output_timezone': 'UTC',
+            'discord_api_auth_token': '',
+            'game_name_display': 'Fleet',
+            'server_filter': {'game': 'legacy', 'needpass': '0'},
+            'db_url': f'sqlite://{os.path.join(work_dir, "data.db")}',
+            'additional_servers': None,
+        }, config_file)
+    os.environ['CONFIG_PATH'] = config_path
+    from et_discord_bot import bot
+
+    with mock.patch.object(bot, 'DiscordClient'):
+        etbot = bot.ETBot(api_auth_token='', loop=loop)
+    client = etbot._etclient
+    client.MASTER_SERVERS = [fleet.master_addr]
+    client.rate_limiter = TokenBucketRateLimiter(64 * 1024 * 1024, args.packet_rate, loop=loop)
+    recorder = ProbeRecorder(client, loop)
+    try:
+        started_at = time.perf_counter()
+        etbot._hosts.raw = await etbot._query_server_list()
+        list_time = time.perf_counter() - started_at
+
+        # Otherwise the sweep would be served from the refresh's cached responses, rather than probing.
+        client._info_cache.clear()
+        started_at = time.perf_counter()
+        await etbot._poll_due_hosts()
+        sweep_time = time.perf_counter() - started_at
+    finally:
+        recorder.close()
+        for output in etbot._outputs:
+            output.publisher.close()
+        client.close()
+        etbot._db.close()
+
+    return {
+        'servers_matching_filter': len(etbot._hosts.raw),
+        'server_list_wall_time_s': list_time,
+        'sweep_wall_time_s': sweep_time,
+        'servers_polled': len(etbot._host_details_cache),
+        'packets_sent': client.rate_limiter.sent_packets,
+        **recorder.results(fleet_fds),
+    }
+
+
+async def run(loop, args):
+    fleet = Fleet(
+        loop,
+        server_count=args.servers,
+        base_port=args.base_port,
+        rtt=args.rtt_ms / 1000,
+        rtt_jitter=args.rtt_jitter_ms / 1000,
+        loss=args.loss,
+        dead_fraction=args.dead_fraction,
+        max_players=args.max_players,
+        records_per_packet=args.records_per_packet,
+        seed=args.seed,
+    )
+    await fleet.start()
+    fleet_fds = _fd_count()
+    results = {'parameters': vars(args)}
+    try:
+        if args.scenario in ('client', 'all'):
+            results['client'] = await run_client_scenario(loop, fleet, args, fleet_fds)
+        if args.scenario in ('bot', 'all'):
+            try:
+                with tempfile.TemporaryDirectory() as work_dir:
+                    results['bot'] = await run_bot_scenario(loop, fleet, args, fleet_fds, work_dir)
+            except ImportError as e:
+                results['bot'] = {'skipped': f'Unable to import the bot: {e}'}
+    finally:
+        fleet.close()
+    results['fleet_requests_received'] = fleet.requests_received
+    results['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Includes the fleet.
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--servers', type=int, default=2000)
+    parser.add_argument('--base-port', type=int, default=30000)
+    parser.add_argument('--rtt-ms', type=float, default=20)
+    parser.add_argument('--rtt-jitter-ms', type=float, default=10)
+    parser.add_argument('--loss', type=float, default=0.01)
+    parser.add_argument('--dead-fraction', type=float, default=0.05)
+    parser.add_argument('--max-players', type=int, default=20)
+    parser.add_argument('--records-per-packet', type=int, default=200)
+    parser.add_argument('--packet-rate', type=float, default=5000,
+                        help='Outbound packets per second, in place of OUTBOUND_GLOBAL_MAX_PACKET_RATE.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenario', choices=['client', 'bot', 'all'], default='all')
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    parser.add_argument('--capture', help='Capture the client scenario\'s traffic to this file, for replay_capture.')
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    results = loop.run_until_complete(run(loop, args))
+    json.dump(results, sys.stdout, indent=4)
+    print()
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+
+def _fd_count():
+    return len(os.listdir('/proc/self/fd'))
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+if __name__ == '__main__':
+    main()
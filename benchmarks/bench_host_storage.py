@@ -0,0 +1,88 @@
+"""
+Benchmark of HostManagerModel save/load for a large host list, comparing the per-host SELECT + UPDATE/INSERT save the
+bot used to do against the bulk upsert.
+
+Usage: python -m benchmarks.bench_host_storage [host_count]
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from et_discord_bot.storage import Database, HostManagerModel
+
+DEFAULT_HOST_COUNT = 10000
+
+
+def random_hosts(count, seed):
+    rng = random.Random(seed)
+    return list({
+        (f'{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}',
+         rng.randrange(27960, 27990))
+        for _ in range(count)
+    })
+
+
+def legacy_save(db_path, hosts):
+    with sqlite3.connect(db_path) as db_conn:
+        c = db_conn.cursor()
+        c.execute('CREATE TABLE IF NOT EXISTS host (id INTEGER PRIMARY KEY, ip TEXT, port INT, active INT)')
+        c.execute('UPDATE host SET active=0')
+        for host in hosts:
+            c.execute('SELECT id FROM host WHERE ip=? AND port=?', (host[0], host[1],))
+            result = c.fetchall()
+            if result:
+                c.execute('UPDATE host SET active=1 WHERE id=?', (result[0][0],))
+            else:
+                c.execute('INSERT INTO host (ip, port, active) VALUES (?, ?, 1)', (host[0], host[1],))
+
+
+def legacy_load(db_path):
+    with sqlite3.connect(db_path) as db_conn:
+        c = db_conn.cursor()
+        c.execute('SELECT ip, port FROM host WHERE active=1')
+        return c.fetchall()
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    host_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_HOST_COUNT
+    first_hosts = random_hosts(host_count, seed=0)
+    # The next refresh keeps 90% of the hosts and replaces the rest.
+    second_hosts = first_hosts[:host_count * 9 // 10] + random_hosts(host_count // 10, seed=1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = os.path.join(tmp_dir, 'legacy.db')
+        initial, _ = timed(lambda: legacy_save(legacy_path, first_hosts))
+        refresh, _ = timed(lambda: legacy_save(legacy_path, second_hosts))
+        load, _ = timed(lambda: legacy_load(legacy_path))
+        print(f'legacy ({host_count} hosts): initial save {initial * 1e3:9.1f} ms, '
+              f'refresh save {refresh * 1e3:9.1f} ms, load {load * 1e3:7.1f} ms')
+
+        loop = asyncio.get_event_loop()
+        db = Database(f'sqlite://{os.path.join(tmp_dir, "bulk.db")}', loop=loop)
+        hosts = HostManagerModel(db)
+
+        def save(host_list):
+            hosts.raw = host_list
+            loop.run_until_complete(hosts.save())
+
+        loop.run_until_complete(hosts.load())  # Open the connection and migrate outside of the measurement.
+        initial, _ = timed(lambda: save(first_hosts))
+        refresh, _ = timed(lambda: save(second_hosts))
+        load, _ = timed(lambda: loop.run_until_complete(hosts.load()))
+        db.close()
+        print(f'bulk   ({host_count} hosts): initial save {initial * 1e3:9.1f} ms, '
+              f'refresh save {refresh * 1e3:9.1f} ms, load {load * 1e3:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
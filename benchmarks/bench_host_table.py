@@ -0,0 +1,99 @@
+"""
+Benchmark of HostTable against the lists and sets of (ip, port) tuples the bot used to keep host lists in: memory held
+by a host list, building it from a master server list, and diffing two consecutive lists.
+
+Usage: python -m benchmarks.bench_host_table [host_count]
+"""
+import array
+import random
+import sys
+import timeit
+import tracemalloc
+
+from et_discord_bot.hosttable import HostTable, unpack_address
+
+DEFAULT_HOST_COUNT = 50000
+
+
+def random_addresses(count, seed):
+    rng = random.Random(seed)
+    return array.array('Q', dict.fromkeys(
+        rng.randrange(1 << 24, 224 << 24) << 16 | rng.randrange(27960, 27990) for _ in range(count)
+    ))
+
+
+def allocated(func):
+    # Bytes still allocated by func's result, measured with the inputs already in memory.
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, result
+
+
+def legacy_list(addresses):
+    return [unpack_address(address) for address in addresses]
+
+
+def legacy_diff(old, new):
+    old, new = set(old), set(new)
+    return new - old, old - new, old | new
+
+
+def table_diff(old, new):
+    return new - old, old - new, old | new
+
+
+def indexed_table(addresses):
+    table = HostTable(addresses)
+    ('0.0.0.0', 0) in table  # Builds the index.
+    return table
+
+
+def main():
+    host_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_HOST_COUNT
+    first = random_addresses(host_count, seed=0)
+    # The next refresh keeps 90% of the hosts and replaces the rest.
+    second = first[:host_count * 9 // 10] + random_addresses(host_count // 10, seed=1)
+
+    list_size, old_list = allocated(lambda: legacy_list(first))
+    set_size, _ = allocated(lambda: set(old_list))
+    table_size, _ = allocated(lambda: HostTable(first))
+    indexed_size, _ = allocated(lambda: indexed_table(first))
+    print(f'memory ({len(first)} hosts):')
+    print(f'  list of tuples:      {list_size / 1024:9.0f} KiB ({list_size / len(first):5.1f} B/host)')
+    print(f'  + set of tuples:     {(list_size + set_size) / 1024:9.0f} KiB '
+          f'({(list_size + set_size) / len(first):5.1f} B/host)')
+    print(f'  HostTable:           {table_size / 1024:9.0f} KiB ({table_size / len(first):5.1f} B/host)')
+    print(f'  HostTable + index:   {indexed_size / 1024:9.0f} KiB ({indexed_size / len(first):5.1f} B/host)')
+
+    number = 20
+    legacy_build = timeit.timeit(lambda: legacy_list(first), number=number) / number
+    table_build = timeit.timeit(lambda: HostTable(first), number=number) / number
+    print('build from master list:')
+    print(f'  list of tuples: {legacy_build * 1e3:8.2f} ms')
+    print(f'  HostTable:      {table_build * 1e3:8.2f} ms  {legacy_build / table_build:.1f}x')
+
+    old_list, new_list = legacy_list(first), legacy_list(second)
+    old_table, new_table = HostTable(first), HostTable(second)
+    legacy_added, legacy_removed, legacy_union = legacy_diff(old_list, new_list)
+    added, removed, union = table_diff(old_table, new_table)
+    assert(legacy_added == set(added) and legacy_removed == set(removed) and legacy_union == set(union))
+
+    # The lists of tuples had to be turned into sets for every diff. Tables keep their index, and are kept themselves
+    # (e.g. HostManagerModel.raw between saves), so that's usually already built. Both cases are measured, the second
+    # with fresh tables over the same arrays each round.
+    legacy_time = timeit.timeit(lambda: legacy_diff(old_list, new_list), number=number) / number
+    indexed_time = timeit.timeit(lambda: table_diff(old_table, new_table), number=number) / number
+    unindexed_time = timeit.timeit(
+        lambda: table_diff(HostTable._from_unique(first), HostTable._from_unique(second)), number=number
+    ) / number
+    print(f'diff (added {len(added)}, removed {len(removed)}, union {len(union)}):')
+    print(f'  sets of tuples:                 {legacy_time * 1e3:8.2f} ms')
+    print(f'  HostTable, indexes built:       {indexed_time * 1e3:8.2f} ms  {legacy_time / indexed_time:.1f}x')
+    print(f'  HostTable, building indexes:    {unindexed_time * 1e3:8.2f} ms  {legacy_time / unindexed_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
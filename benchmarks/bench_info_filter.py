@@ -0,0 +1,82 @@
+"""
+Benchmark of a server list refresh's infoResponse handling, comparing decoding every response and then checking it
+against the server filter, as the bot used to, with rejecting responses on their raw bytes with an InfoFilter first.
+
+Usage: python -m benchmarks.bench_info_filter [response_count] [matching_fraction]
+"""
+import random
+import sys
+import timeit
+
+from et_discord_bot.etwolf_client import ETClientProtocol, InfoFilter
+
+DEFAULT_RESPONSE_COUNT = 20000
+DEFAULT_MATCHING_FRACTION = 0.2
+SERVER_FILTER = {'game': 'legacy', 'needpass': '0'}
+
+
+def synthetic_responses(count, matching_fraction, seed=0):
+    rng = random.Random(seed)
+    responses = []
+    for i in range(count):
+        if rng.random() < matching_fraction:
+            game, needpass = 'legacy', '0'
+        else:
+            game, needpass = rng.choice([('etmain', '0'), ('etpro', '0'), ('legacy', '1'), ('nq', '0')])
+        humans = rng.randrange(0, 20)
+        info = (
+            f'\\challenge\\xxx\\version\\ET Legacy v2.78.1 linux-x86_64\\protocol\\84\\hostname\\^1server ^7{i}'
+            f'\\serverload\\0\\mapname\\supply\\clients\\{humans}\\humans\\{humans}\\sv_maxclients\\24\\gametype\\4'
+            f'\\pure\\1\\game\\{game}\\friendlyFire\\1\\maxlives\\0\\needpass\\{needpass}\\gamename\\et'
+            f'\\g_antilag\\1\\weaprestrict\\100\\balancedteams\\1'
+        )
+        players = ''.join(f'\n{rng.randrange(200)} {rng.randrange(999)} "^{j % 10}player{j}"' for j in range(humans))
+        responses.append(f'infoResponse\n{info}{players}'.encode())
+    return responses
+
+
+def host_details_match_filter(host_details, server_filter):
+    # ETBot._host_details_match_filter
+    for key in server_filter:
+        if key not in host_details:
+            return False
+        if host_details[key] != server_filter[key]:
+            return False
+    return True
+
+
+def decode_all(protocol, responses):
+    return [
+        host_details_match_filter(protocol.decode_infoResponse(data), SERVER_FILTER)
+        for data in responses
+    ]
+
+
+def filter_first(protocol, info_filter, responses):
+    return [
+        info_filter(data) and host_details_match_filter(protocol.decode_infoResponse(data), SERVER_FILTER)
+        for data in responses
+    ]
+
+
+def main():
+    response_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RESPONSE_COUNT
+    matching_fraction = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MATCHING_FRACTION
+    responses = synthetic_responses(response_count, matching_fraction)
+    protocol = ETClientProtocol(loop=None, rate_limiter=None)
+    info_filter = InfoFilter([SERVER_FILTER])
+
+    matches = decode_all(protocol, responses)
+    assert(filter_first(protocol, info_filter, responses) == matches)
+
+    number = 5
+    decode_time = timeit.timeit(lambda: decode_all(protocol, responses), number=number) / number
+    filter_time = timeit.timeit(lambda: filter_first(protocol, info_filter, responses), number=number) / number
+    print(f'{len(responses)} infoResponses, {sum(matches)} matching {SERVER_FILTER}')
+    print(f'  decode all:   {decode_time * 1e3:8.2f} ms/sweep ({decode_time / len(responses) * 1e6:6.2f} us/response)')
+    print(f'  filter first: {filter_time * 1e3:8.2f} ms/sweep ({filter_time / len(responses) * 1e6:6.2f} us/response)'
+          f'  {decode_time / filter_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
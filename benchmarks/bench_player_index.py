@@ -0,0 +1,76 @@
+"""
+Benchmark of PlayerIndex: applying a status sweep's polls incrementally, against rebuilding the index from every host,
+and the latency of exact, prefix and substring lookups.
+
+Usage: python -m benchmarks.bench_player_index [server_count]
+"""
+import random
+import sys
+import timeit
+
+from et_discord_bot.etwolf_client import ServerInfo
+from et_discord_bot.players import PlayerIndex
+
+DEFAULT_SERVER_COUNT = 2000
+SYLLABLES = ['fat', 'boy', 'sni', 'per', 'ma', 'rio', 'ki', 'ller', 'ne', 'xus', 'pan', 'zer', 'do', 'om', 'ra', 'ge']
+
+
+def random_name(rng):
+    name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randrange(2, 5)))
+    return f'^{rng.randrange(10)}{name[:3]}^7{name[3:]}{rng.randrange(100)}'
+
+
+def random_sweep(rng, hosts, previous=None, churn=0.1):
+    # Each sweep every host's scores and pings change, and churn of the players leave and are replaced.
+    sweep = {}
+    for host in hosts:
+        names = previous[host] if previous else [random_name(rng) for _ in range(rng.randrange(0, 20))]
+        names = [name if rng.random() >= churn else random_name(rng) for name in names]
+        sweep[host] = names
+    return sweep
+
+
+def host_infos(rng, sweep):
+    return {
+        host: ServerInfo({}, [f'{rng.randrange(200)} {rng.randrange(999)} "{name}"' for name in names])
+        for host, names in sweep.items()
+    }
+
+
+def main():
+    server_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SERVER_COUNT
+    rng = random.Random(0)
+    hosts = [(f'192.0.{i // 256}.{i % 256}', 27960) for i in range(server_count)]
+    first = random_sweep(rng, hosts)
+    second = random_sweep(rng, hosts, previous=first)
+    first_infos, second_infos = host_infos(rng, first), host_infos(rng, second)
+
+    def incremental():
+        index = PlayerIndex()
+        for host, host_info in first_infos.items():
+            index.update(host, host_info)
+        return timeit.timeit(lambda: [index.update(host, host_info) for host, host_info in second_infos.items()],
+                             number=1), index
+
+    def rebuild():
+        index = PlayerIndex()
+        for host, host_info in second_infos.items():
+            index.update(host, host_info)
+        return index
+
+    incremental_time, index = min((incremental() for _ in range(5)), key=lambda result: result[0])
+    rebuild_time = min(timeit.repeat(rebuild, number=1, repeat=5))
+    print(f'{server_count} servers, {len(index)} distinct player names')
+    print(f'  sweep, incremental: {incremental_time * 1e3:8.2f} ms')
+    print(f'  sweep, rebuild:     {rebuild_time * 1e3:8.2f} ms  {rebuild_time / incremental_time:.1f}x')
+
+    number = 10000
+    some_name = next(name for names in second.values() for name in names)
+    for kind, query in [('exact', some_name), ('prefix', 'fatb'), ('substring', 'erm'), ('short substring', 'om')]:
+        results = len(index.find(query, limit=11))
+        lookup_time = timeit.timeit(lambda: index.find(query, limit=11), number=number) / number
+        print(f'  find {kind:<16} "{query}": {lookup_time * 1e6:9.1f} us ({results} results)')
+
+
+if __name__ == '__main__':
+    main()
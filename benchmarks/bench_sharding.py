@@ -0,0 +1,88 @@
+"""
+Benchmark of probe throughput against a simulated fleet (see fleet.py, run in its own process), probing every server
+once from the main process' ETClient and then from ProbeShardPools of increasing size. Also reports the main process'
+CPU time, which is what the worker processes take off the loop that owns the Discord connection.
+
+Usage: python -m benchmarks.bench_sharding [server_count] [max_workers]
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+
+from benchmarks.fleet import Fleet
+from et_discord_bot.etwolf_client import ETClient
+from et_discord_bot.ratelimit import TokenBucketRateLimiter
+from et_discord_bot.sharding import ProbeShardPool
+
+DEFAULT_SERVER_COUNT = 4000
+DEFAULT_MAX_WORKERS = 4
+FLEET_PROCESSES = 4  # So the fleet keeps up with the probes.
+PACKET_RATE = 20000  # High enough that the rate limiter isn't the bottleneck.
+
+
+def run_fleet(server_count, base_port, connection):
+    loop = asyncio.new_event_loop()
+    fleet = Fleet(loop, server_count, base_port=base_port, rtt=0.005, rtt_jitter=0.005)
+    loop.run_until_complete(fleet.start())
+    connection.send(fleet.servers)
+    loop.run_until_complete(loop.run_in_executor(None, connection.recv))
+    fleet.close()
+
+
+async def sweep(prober, servers):
+    started_at = time.perf_counter()
+    cpu_started_at = time.process_time()
+    results = await asyncio.gather(*(prober.get_server_info(ip, port) for ip, port in servers), return_exceptions=True)
+    failures = sum(isinstance(result, Exception) for result in results)
+    return time.perf_counter() - started_at, time.process_time() - cpu_started_at, failures
+
+
+def main():
+    server_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SERVER_COUNT
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MAX_WORKERS
+
+    connections = []
+    fleet_processes = []
+    fleet_size = server_count // FLEET_PROCESSES
+    for i in range(FLEET_PROCESSES):
+        connection, fleet_connection = multiprocessing.Pipe()
+        fleet_process = multiprocessing.get_context('spawn').Process(
+            target=run_fleet,
+            args=(fleet_size, 31000 + i * (fleet_size + 1), fleet_connection)  # Each fleet's master takes a port too.
+        )
+        fleet_process.start()
+        connections.append(connection)
+        fleet_processes.append(fleet_process)
+    servers = [server for connection in connections for server in connection.recv()]
+
+    loop = asyncio.get_event_loop()
+    try:
+        client = ETClient(loop)
+        client.rate_limiter = TokenBucketRateLimiter(64 * 1024 * 1024, PACKET_RATE, loop=loop)
+        wall_time, cpu_time, failures = loop.run_until_complete(sweep(client, servers))
+        client.close()
+        print(f'in-process: {len(servers) / wall_time:8,.0f} probes/s  main process CPU {cpu_time:.2f}s  '
+              f'{failures} failed')
+
+        workers = 1
+        while workers <= max_workers:
+            # The pool keeps a share of the rate for the main process' master queries, which aren't sent here, so it's
+            # scaled up to give the workers the same total rate as the in-process client.
+            scale = (workers + 1) / workers
+            pool = ProbeShardPool(workers, loop=loop, bytes_per_second=64 * 1024 * 1024 * scale,
+                                  packets_per_second=PACKET_RATE * scale)
+            loop.run_until_complete(pool.start())
+            wall_time, cpu_time, failures = loop.run_until_complete(sweep(pool, servers))
+            pool.close()
+            print(f'{workers} workers: {len(servers) / wall_time:8,.0f} probes/s  main process CPU {cpu_time:.2f}s  '
+                  f'{failures} failed')
+            workers *= 2
+    finally:
+        for connection, fleet_process in zip(connections, fleet_processes):
+            connection.send('stop')
+            fleet_process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+A simulated fleet of ET servers and a master server listing them, all on loopback inside the current process, for load
+benchmarking ETClient and ETBot without touching the network. See bench_fleet.py.
+"""
+import asyncio
+import random
+import resource
+import struct
+
+from et_discord_bot.hosttable import pack_address
+
+FLEET_HOST = '127.0.0.1'
+MAPS = ['oasis', 'radar', 'railgun', 'fueldump', 'battery', 'goldrush', 'supply', 'sw_oasis_b3']
+
+
+class FakeETServerProtocol(asyncio.DatagramProtocol):
+    """
+    Answers getinfo with an infoResponse after rtt seconds (plus up to jitter), dropping a loss fraction of requests.
+    Dead servers never answer.
+    """
+
+    def __init__(self, fleet, info_response, dead):
+        self.fleet = fleet
+        self.info_response = info_response
+        self.dead = dead
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.fleet.requests_received += 1
+        if self.dead or not data.startswith(b'\xff\xff\xff\xffgetinfo'):
+            return
+        if self.fleet.rng.random() < self.fleet.loss:
+            return
+        delay = self.fleet.rtt + self.fleet.rng.random() * self.fleet.rtt_jitter
+        self.fleet.loop.call_later(delay, self._respond, addr)
+
+    def _respond(self, addr):
+        if not self.transport.is_closing():
+            self.transport.sendto(self.info_response, addr)
+
+
+class FakeMasterProtocol(asyncio.DatagramProtocol):
+    """
+    Answers getservers with the fleet's server list, split into multiple getserversResponse packets.
+    """
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if not data.startswith(b'\xff\xff\xff\xffgetservers'):
+            return
+        for packet in self.fleet.getservers_response_packets():
+            self.fleet.loop.call_later(self.fleet.rtt, self.transport.sendto, packet, addr)
+
+
+class Fleet(object):
+
+    def __init__(self, loop, server_count, base_port=30000, rtt=0.02, rtt_jitter=0.01, loss=0.0, dead_fraction=0.0,
+                 max_players=20, records_per_packet=200, seed=0):
+        self.loop = loop
+        self.server_count = server_count
+        self.base_port = base_port
+        self.rtt = rtt
+        self.rtt_jitter = rtt_jitter
+        self.loss = loss
+        self.dead_fraction = dead_fraction
+        self.max_players = max_players
+        self.records_per_packet = records_per_packet
+        self.rng = random.Random(seed)
+        self.requests_received = 0
+        self.servers = []  # (ip, port)
+        self.master_addr = None
+        self._transports = []
+
+    async def start(self):
+        _raise_fd_limit(self.server_count + 1024)
+        for i in range(self.server_count):
+            port = self.base_port + i
+            transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: FakeETServerProtocol(self, self._info_response(i), self.rng.random() < self.dead_fraction),
+                local_addr=(FLEET_HOST, port)
+            )
+            self._transports.append(transport)
+            self.servers.append((FLEET_HOST, port))
+
+        transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: FakeMasterProtocol(self),
+            local_addr=(FLEET_HOST, self.base_port + self.server_count)
+        )
+        self._transports.append(transport)
+        self.master_addr = (FLEET_HOST, self.base_port + self.server_count)
+
+    def close(self):
+        for transport in self._transports:
+            transport.close()
+        self._transports = []
+
+    def getservers_response_packets(self):
+        records = [b'\\' + struct.pack('!Q', pack_address(ip, port))[2:] for ip, port in self.servers]
+        packets = []
+        for i in range(0, len(records), self.records_per_packet):
+            terminator = b'\\EOT\0\0\0' if i + self.records_per_packet >= len(records) else b''
+            packets.append(
+                b'\xff\xff\xff\xffgetserversResponse' + b''.join(records[i:i + self.records_per_packet]) + terminator
+            )
+        return packets
+
+    def _info_response(self, i):
+        humans = self.rng.choice([0, 0, 0, self.rng.randrange(self.max_players + 1)])
+        info = {
+            'hostname': f'^{i % 10}fleet^7server {i}',
+            'mapname': self.rng.choice(MAPS),
+            'clients': str(humans + self.rng.randrange(3)),
+            'humans': str(humans),
+            'sv_maxclients': str(self.max_players),
+            'game': self.rng.choice(['legacy', 'legacy', 'etmain', 'etpro']),
+            'needpass': self.rng.choice(['0', '0', '0', '1']),
+            'protocol': '84',
+            'gametype': '5',
+        }
+        info_string = ''.join(f'\\{key}\\{value}' for key, value in info.items())
+        return b'\xff\xff\xff\xffinfoResponse\n' + info_string.encode()
+
+
+def _raise_fd_limit(required):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < required:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(required, hard), hard))
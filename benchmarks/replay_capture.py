@@ -0,0 +1,122 @@
+"""
+Replays a capture file (see et_discord_bot/capture.py, recorded with the capture_path setting or bench_fleet --capture)
+offline, for benchmarking and profiling on real traffic with no network.
+
+The decode mode feeds every received datagram straight into the ETClientProtocol decoders, as fast as possible. The
+socket mode delivers them to an ETClientProtocol on a running event loop, at the recorded timing divided by --speed
+(0 for no delays), and reports how far behind schedule the loop fell.
+
+Usage: python -m benchmarks.replay_capture CAPTURE [--mode decode|socket] [--speed 1] [--repeat 1] [--profile]
+"""
+import argparse
+import asyncio
+import collections
+import cProfile
+import pstats
+import time
+
+from et_discord_bot.capture import RECEIVED, CaptureReader
+from et_discord_bot.etwolf_client import ETClientProtocol
+
+PROFILE_LINES = 25
+
+
+def received_datagrams(reader):
+    # Loaded up front, so the measurements don't include reading the capture.
+    return [datagram for datagram in reader if datagram.direction == RECEIVED]
+
+
+def replay_decode(datagrams, repeat):
+    protocol = ETClientProtocol(loop=None, rate_limiter=None)
+    counts = collections.Counter()
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        for datagram in datagrams:
+            data = datagram.data
+            if data.startswith(b'infoResponse', 4):
+                protocol.decode_infoResponse(data[4:])
+                counts['infoResponse'] += 1
+            elif data.startswith(b'getserversResponse', 4):
+                protocol.decode_getserversResponse(data)
+                counts['getserversResponse'] += 1
+            else:
+                counts['other'] += 1
+    elapsed = time.perf_counter() - started_at
+    return elapsed, counts
+
+
+class _ReplayTransport(asyncio.DatagramTransport):
+    # Stands in for the socket, replies to anything sent are already in the capture.
+
+    def sendto(self, data, addr=None):
+        pass
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+
+async def replay_socket(loop, datagrams, speed):
+    protocol = ETClientProtocol(loop, rate_limiter=None)
+    protocol.connection_made(_ReplayTransport())
+    first_timestamp = datagrams[0].timestamp
+    started_at = loop.time()
+    max_lag = 0.0
+    total_lag = 0.0
+    for datagram in datagrams:
+        due_at = started_at + (datagram.timestamp - first_timestamp) / speed if speed else started_at
+        delay = due_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lag = max(loop.time() - due_at, 0.0)
+        max_lag = max(max_lag, lag)
+        total_lag += lag
+        protocol.datagram_received(datagram.data, datagram.addr)
+        protocol.message_queue.clear()
+    return loop.time() - started_at, total_lag / len(datagrams), max_lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('capture')
+    parser.add_argument('--mode', choices=['decode', 'socket'], default='decode')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Socket mode replay speed, relative to the recorded timing. 0 for no delays.')
+    parser.add_argument('--repeat', type=int, default=1, help='Decode mode passes over the capture.')
+    parser.add_argument('--profile', action='store_true', help='Run under cProfile and print the top functions.')
+    args = parser.parse_args()
+
+    with CaptureReader(args.capture) as reader:
+        datagrams = received_datagrams(reader)
+    if not datagrams:
+        print(f'{args.capture} holds no received datagrams.')
+        return
+    duration = datagrams[-1].timestamp - datagrams[0].timestamp
+    print(f'{len(datagrams)} received datagrams ({sum(len(datagram.data) for datagram in datagrams)} bytes) over '
+          f'{duration:.1f} s of capture')
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    if args.mode == 'decode':
+        elapsed, counts = replay_decode(datagrams, args.repeat)
+        decoded = sum(counts.values())
+        print(f'decode: {elapsed * 1e3:.1f} ms for {decoded} datagrams ({decoded / elapsed:,.0f} datagrams/s), '
+              f'{dict(counts)}')
+    else:
+        loop = asyncio.new_event_loop()
+        try:
+            elapsed, mean_lag, max_lag = loop.run_until_complete(replay_socket(loop, datagrams, args.speed))
+        finally:
+            loop.close()
+        if args.speed:
+            print(f'socket: replayed in {elapsed:.2f} s at speed {args.speed:g}, lag mean {mean_lag * 1e3:.2f} ms, '
+                  f'max {max_lag * 1e3:.2f} ms')
+        else:
+            print(f'socket: replayed in {elapsed * 1e3:.1f} ms without delays')
+    if profiler is not None:
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(PROFILE_LINES)
+
+
+if __name__ == '__main__':
+    main()
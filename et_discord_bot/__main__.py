@@ -5,6 +5,7 @@ import time
 
 from .bot import ETBot
 from .config import config
+from .metrics import MetricsServer
 
 async def terminate_loop_if_bot_unhealthy(loop, bot):
     while bot.is_healthy():
@@ -33,6 +34,8 @@ def main():
         bot = ETBot(config.discord_api_auth_token, loop)
         loop.create_task(bot.start())
         loop.create_task(terminate_loop_if_bot_unhealthy(loop, bot))
+        if config.metrics_port is not None:
+            loop.create_task(MetricsServer(config.metrics_port, bot.is_healthy, loop).start())
         loop.add_signal_handler(signal.SIGINT, lambda: loop.create_task(gracefully_terminate(loop, bot)))
         loop.add_signal_handler(signal.SIGTERM, lambda: loop.create_task(gracefully_terminate(loop, bot)))
         loop.run_forever()
@@ -1,19 +1,43 @@
 import asyncio
-import copy
 import datetime
+import functools
 import logging
-import socket
-import sqlite3
+import re
+import time
 
 import discord
 import pytz
 
-from .config import config
-from .etwolf_client import ETClient
+from . import metrics
+from .config import config, status_outputs
+from .etwolf_client import (ET_SERVER_RESPONSE_TIMEOUT, ET_SERVER_RESPONSE_TRIES, ETClient, InfoFilter,
+                            strip_color_codes)
+from .history import PlayerHistory
+from .hosttable import HostTable, pack_address, unpack_address
+from .pipeline import PROBE_CONCURRENCY, probe_as_completed
+from .players import PlayerIndex
+from .publisher import StatusPublisher
+from .scheduler import PollScheduler
+from .sharding import ProbeShardPool
+from .storage import Database, HostManagerModel, StatusMessageModel
 from .util import get_time_until_next_interval_start
 
 SERVER_LIST_UPDATE_FREQUENCY = datetime.timedelta(minutes=15)
+# Hosts that stay listed are only probed again by the server list refresh once their filter match is this old.
+SERVER_LIST_RECHECK_AGE = datetime.timedelta(hours=1)
 STATUS_UPDATE_FREQUENCY = datetime.timedelta(seconds=60)
+# Long enough for a host that uses up every try at the longest timeout (see RTTTracker.retry_schedule) to fail within
+# the sweep, plus some slack for probes queued behind the rate limiter.
+STATUS_SWEEP_DEADLINE = ET_SERVER_RESPONSE_TIMEOUT * ET_SERVER_RESPONSE_TRIES + datetime.timedelta(seconds=5)
+STATUS_POLL_MIN_SLEEP = datetime.timedelta(seconds=1)
+
+PLAYER_SEARCH_COMMAND = re.compile(r'\s*where\s+is\s+(?P<query>.+?)\s*\??\s*$', re.IGNORECASE)
+PLAYER_SEARCH_MAX_RESULTS = 10
+
+HOST_SORT_KEYS = {
+    'players': lambda host_info: (-host_info.clients, host_info.hostname_plaintext),
+    'name': lambda host_info: (host_info.hostname_plaintext.lower(), host_info.ip, host_info.port),
+}
 
 
 class DiscordClient(discord.Client):
@@ -34,40 +58,37 @@ class DiscordClient(discord.Client):
         await self.connect()
 
 
-class HostManagerModel(object):
-
-    def __init__(self):
-        self.raw = []
-        assert(config.db_url.startswith('sqlite://'))  # No other DBMSes supported right now
-        self._sqlite_db_path = config.db_url.replace('sqlite://', '')
-        self._migrate()
-        self._load_from_db()
-
-    def save(self):
-        with sqlite3.connect(self._sqlite_db_path) as db_conn:
-            c = db_conn.cursor()
-            c.execute('UPDATE host SET active=0')
-            for host in self.raw:
-                c.execute('SELECT id FROM host WHERE ip=? AND port=?', (host[0], host[1],))
-                result = c.fetchall()
-                if result:
-                    c.execute('UPDATE host SET active=1 WHERE id=?', (result[0][0],))
-                else:
-                    c.execute('INSERT INTO host (ip, port, active) VALUES (?, ?, 1)', (host[0], host[1],))
+class DiscordRateLimitCounter(logging.Filter):
+    """
+    discord.py handles 429 responses itself, sleeping and retrying, and only logs them. Counts them from those log
+    records.
+    """
 
-    def refresh_from_db(self):
-        self._load_from_db()
+    def filter(self, record):
+        if record.getMessage().startswith('We are being rate limited'):
+            metrics.DISCORD_RATE_LIMITED.inc()
+        return True
 
-    def _migrate(self):
-        with sqlite3.connect(self._sqlite_db_path) as db_conn:
-            c = db_conn.cursor()
-            c.execute('CREATE TABLE IF NOT EXISTS host (id INTEGER PRIMARY KEY, ip TEXT, port INT, active INT)')
 
-    def _load_from_db(self):
-        with sqlite3.connect(self._sqlite_db_path) as db_conn:
-            c = db_conn.cursor()
-            c.execute('SELECT ip, port FROM host WHERE active=1')
-            self.raw = c.fetchall()
+logging.getLogger('discord.http').addFilter(DiscordRateLimitCounter())
+
+
+class StatusOutput(object):
+    """
+    A channel the status is posted to, showing the hosts matching its server_filter ordered by its sort, with its own
+    StatusPublisher.
+    """
+
+    def __init__(self, output_config, publish, loop):
+        self.channel_id = output_config.channel
+        self.server_filter = output_config.server_filter
+        self.sort_key = HOST_SORT_KEYS[output_config.sort]
+        # Outputs with equal filter_keys see the same hosts, and with equal view_keys the same rendered status.
+        self.filter_key = frozenset(output_config.server_filter.items())
+        self.view_key = (self.filter_key, output_config.sort)
+        self.channel = None
+        self.message = None
+        self.publisher = StatusPublisher(functools.partial(publish, self), loop=loop)
 
 
 class ETBot(object):
@@ -78,20 +99,54 @@ class ETBot(object):
         self._dclient.add_event_callback('on_ready', lambda: self._on_discord_ready())
         self._dclient.add_event_callback('on_message', lambda message: self._on_discord_message(message))
 
-        self._etclient = ETClient(loop)
+        self._etclient = ETClient(loop, capture_path=config.capture_path)
+        # Server probes go through a pool of worker processes if configured, the master queries always go through
+        # _etclient. _prober.rtt holds the RTT estimates either way.
+        if config.probe_workers:
+            self._shard_pool = ProbeShardPool(config.probe_workers, loop=self.loop, capture_path=config.capture_path)
+            self._etclient.rate_limiter = self._shard_pool.main_rate_limiter()
+            self._prober = self._shard_pool
+        else:
+            self._shard_pool = None
+            self._prober = self._etclient
 
         self._healthy = True
         self._started = False
         self._initialized_at = datetime.datetime.now(pytz.utc)
         self._sent_last_message_at = None
 
-        self._hosts = HostManagerModel()
-        self._status_channel = None
-        self._status_message = None
+        self._db = Database(config.db_url, loop=self.loop)
+        self._hosts = HostManagerModel(self._db)
+        self._status_messages = StatusMessageModel(self._db)
+        self._status_message_ids = {}  # channel id -> message id, as saved by the previous run
+        self._snapshot_saved_at = None  # Of the previous run's host details, shown until the first poll.
+        self._poll_scheduler = PollScheduler()
+        self._scheduled_host_list = None
+        self._host_details_cache = {}  # (ip, port) -> host_info from the latest successful poll
+        self._players = PlayerIndex()  # Of the hosts in _host_details_cache.
+        self._history = PlayerHistory(self._db)
+        self._additional_hosts = set()  # Shown by every output, regardless of its filter.
+        self._listed_hosts = {}  # Packed address -> (checked_at, matches a filter), of the latest master server list
+        self._outputs = [StatusOutput(output, self._publish_status, self.loop) for output in status_outputs(config)]
+        # Server list refresh probes of servers that can't match any output's filter are rejected before decoding.
+        server_filters = list({output.filter_key: output.server_filter for output in self._outputs}.values())
+        self._info_filter = InfoFilter(server_filters) if server_filters and all(server_filters) else None
         self._users_who_have_seen_help_message = set()
 
     async def start(self):
         try:
+            await self._hosts.load()
+            self._prober.rtt.load(await self._hosts.load_rtt())
+            # Warm start: the previous run's host details are shown until the first poll of each host.
+            active = self._hosts.raw
+            snapshot, self._snapshot_saved_at = await self._hosts.load_snapshot()
+            for host_info in snapshot:
+                if (host_info.ip, host_info.port) in active:
+                    self._host_details_cache[(host_info.ip, host_info.port)] = host_info
+                    self._players.update((host_info.ip, host_info.port), host_info)
+            self._status_message_ids = await self._status_messages.load()
+            if self._shard_pool is not None:
+                await self._shard_pool.start()
             await self._dclient.start()
         except Exception:
             self._healthy = False
@@ -100,12 +155,26 @@ class ETBot(object):
     async def logout(self):
         await self._dclient.logout()
         await self._dclient.close()
+        for output in self._outputs:
+            output.publisher.close()
+        self._etclient.close()
+        if self._shard_pool is not None:
+            self._shard_pool.close()
+        await self._hosts.save()
+        await self._hosts.save_rtt(self._prober.rtt.items())
+        await self._hosts.save_snapshot(self._cached_host_details(), time.time())
+        await self._history.flush()
+        self._db.close()
 
     def is_healthy(self):
         # If internally flagged as unhealthy, report unhealthy.
         if not self._healthy:
             return False
 
+        if self._shard_pool is not None and not self._shard_pool.is_healthy():
+            logging.info('A probe worker process died, reporting unhealthy.')
+            return False
+
         # If no recorded activity for 5 minutes, report unhealthy.
         if self._sent_last_message_at:
             last_activity = self._sent_last_message_at
@@ -127,17 +196,33 @@ class ETBot(object):
 
         try:
             logging.info(f'Successfully logged in as {self._dclient.user.name} ({self._dclient.user.id})')
-            self._status_channel = self._dclient.get_channel(config.status_output_channel)
-            async for message in self._status_channel.history(limit=30):
-                if message.author == self._dclient.user:
-                    self._status_message = message
-                    break
+            for output in self._outputs:
+                output.channel = self._dclient.get_channel(output.channel_id)
+                output.message = await self._find_status_message(output.channel)
+            if self._host_details_cache:
+                # Publish the snapshot right away, rather than waiting for the first round of polls, showing when it
+                # was saved as its update time.
+                self._post_serverstatus(self._cached_host_details(), as_of=self._snapshot_saved_at)
             self.loop.create_task(self._update_server_list())
             self.loop.create_task(self._update_status_message())
         except Exception:
             self._healthy = False
             raise
 
+    async def _find_status_message(self, channel):
+        message_id = self._status_message_ids.get(channel.id)
+        if message_id is not None:
+            try:
+                return await channel.fetch_message(message_id)
+            except discord.HTTPException as e:
+                logging.info(f'Unable to fetch the saved status message of #{channel.name}: {e}')
+        # Fall back to looking for it in the recent history.
+        async for message in channel.history(limit=30):
+            if message.author == self._dclient.user:
+                await self._status_messages.save(channel.id, message.id)
+                return message
+        return None
+
     async def _on_discord_message(self, message):
         if message.author == self._dclient.user:
             return
@@ -157,15 +242,35 @@ class ETBot(object):
         await self._dclient.send_message(message.channel, response)
 
     async def _update_status_message(self):
+        # Hosts are polled whenever the poll scheduler has them due, the status is rendered from the latest known state
+        # of every host after each round of polls, and player history is sampled (and the warm start snapshot saved)
+        # once per STATUS_UPDATE_FREQUENCY.
         try:
+            history_due_at = time.time()
             while True:
-                host_details = await self._query_serverstatus()
-                await self._post_serverstatus(host_details)
+                await self._poll_due_hosts()
+                host_details = self._cached_host_details()
+                self._post_serverstatus(host_details)
+
                 now = datetime.datetime.now(pytz.utc)
-                self._sent_last_message_at = now
                 now_in_output_tz = now.astimezone(pytz.timezone(config.output_timezone))
-                sleep_time = get_time_until_next_interval_start(now_in_output_tz, STATUS_UPDATE_FREQUENCY)
-                await asyncio.sleep(sleep_time.total_seconds())
+                until_next_interval = get_time_until_next_interval_start(now_in_output_tz, STATUS_UPDATE_FREQUENCY)
+                if now.timestamp() >= history_due_at:
+                    try:
+                        self._history.record(host_details, now)
+                    except Exception:
+                        logging.exception('Failed to record player history.')
+                    try:
+                        await self._hosts.save_snapshot(host_details, now.timestamp())
+                    except Exception:
+                        logging.exception('Failed to save the host snapshot.')
+                    history_due_at = (now + until_next_interval).timestamp()
+
+                sleep_time = until_next_interval.total_seconds()
+                next_poll_at = self._poll_scheduler.next_due_at()
+                if next_poll_at is not None:
+                    sleep_time = min(sleep_time, max(next_poll_at - time.time(), STATUS_POLL_MIN_SLEEP.total_seconds()))
+                await asyncio.sleep(sleep_time)
                 if self._dclient.is_closed():
                     logging.info('Discord client is_closed!')
                     break
@@ -175,127 +280,273 @@ class ETBot(object):
     async def _update_server_list(self):
         try:
             while True:
-                self._hosts.raw = await self._query_server_list()
-                self._hosts.save()
+                with metrics.SERVER_LIST_REFRESH_DURATION.time():
+                    self._hosts.raw = await self._query_server_list()
+                dead_hosts = self._hosts.prune_dead(
+                    time.time(), datetime.timedelta(hours=config.dead_host_prune_hours)
+                )
+                for host in dead_hosts:
+                    self._prober.rtt.forget(host)
+                if dead_hosts:
+                    logging.info(f'Pruned {len(dead_hosts)} hosts that have stopped responding.')
+                await self._hosts.save()
+                await self._hosts.save_rtt(self._prober.rtt.items())
                 await asyncio.sleep(SERVER_LIST_UPDATE_FREQUENCY.total_seconds())
         finally:
             self._healthy = False
 
-    def _host_details_match_filter(self, host_details):
-        for key in config.server_filter:
+    def _host_details_match_filter(self, host_details, server_filter):
+        for key in server_filter:
             if key not in host_details:
                 return False
-            if host_details[key] != config.server_filter[key]:
+            if host_details[key] != server_filter[key]:
                 return False
         return True
 
+    def _host_details_match_any_filter(self, host_details):
+        # Evaluating each distinct filter once.
+        server_filters = {output.filter_key: output.server_filter for output in self._outputs}.values()
+        return any(self._host_details_match_filter(host_details, server_filter) for server_filter in server_filters)
+
     async def _query_server_list(self):
         logging.info('Updating server list.')
 
-        full_host_list = await self._etclient.get_server_list()
-        tasks = []
-        for hostname, port in full_host_list:
-            tasks.append(self.loop.create_task(self._etclient.get_server_info(hostname, port)))
-        await asyncio.gather(*[h for h in tasks], return_exceptions=True)
-
-        filtered_host_list = []
-        for (hostname, port), task in zip(full_host_list, tasks):
-            if task.exception():
-                continue
-            host_details = task.result()
-            if not self._host_details_match_filter(host_details):
-                continue
-            filtered_host_list.append((hostname, port))
+        # The refresh is incremental: only hosts new to the list, or whose filter match (from a previous refresh or
+        # status poll) is older than SERVER_LIST_RECHECK_AGE, are probed. They're probed as soon as the master servers'
+        # packets listing them arrive, rather than after the full list has been received.
+        # Hosts that are failing and backing off keep their previous membership of the list until they're due again.
+        # The list is tracked by packed address (see pack_address), only hosts that are probed are unpacked.
+        now = time.time()
+        previously_active = self._hosts.raw
+        listed_hosts = {}
+        backing_off_addresses = []
+        server_list_stream = self._etclient.stream_server_list(
+            min_masters=config.master_servers_required,
+            deadline=datetime.timedelta(seconds=config.master_query_deadline),
+        )
 
+        async def hosts_to_probe():
+            async for servers in server_list_stream:
+                for address in servers:
+                    if address in listed_hosts:
+                        continue
+                    checked = self._listed_hosts.get(address)
+                    if checked is not None and now - checked[0] < SERVER_LIST_RECHECK_AGE.total_seconds():
+                        listed_hosts[address] = checked
+                        continue
+                    listed_hosts[address] = None
+                    host = unpack_address(address)
+                    if not self._hosts.probe_due(host, now):
+                        backing_off_addresses.append(address)
+                        continue
+                    yield host
+
+        probed_count = 0
+        probes = probe_as_completed(
+            functools.partial(self._prober.get_server_info, info_filter=self._info_filter),
+            hosts_to_probe(),
+            concurrency=config.probe_concurrency or PROBE_CONCURRENCY,
+        )
+        async for host, host_info, exception in probes:
+            probed_count += 1
+            self._hosts.record_probe(host, exception is None, now)
+            if exception is None:
+                # host_info is None if the server was rejected by the info filter.
+                matches = host_info is not None and self._host_details_match_any_filter(host_info)
+                listed_hosts[pack_address(*host)] = (now, matches)
+        removed_count = sum(address not in listed_hosts for address in self._listed_hosts)
+        self._listed_hosts = {address: checked for address, checked in listed_hosts.items() if checked is not None}
+
+        filtered_hosts = (HostTable(backing_off_addresses) & previously_active).union(
+            HostTable(address for address, (_, matches) in self._listed_hosts.items() if matches)
+        )
+
+        additional_servers = config.additional_servers or []
+        addresses = await self._etclient.resolver.resolve_all(host['hostname'] for host in additional_servers)
         additional_host_list = []
-        for host in config.additional_servers:
-            try:
-                hostname = socket.gethostbyname_ex(host['hostname'])[2][0]
-            except socket.gaierror as e:
-                logging.warning(f'Failed to query custom additional_server, {host["hostname"]}: {e}')
+        for host in additional_servers:
+            address = addresses[host['hostname']]
+            if isinstance(address, Exception):
+                logging.warning(f'Failed to query custom additional_server, {host["hostname"]}: {address}')
             else:
-                additional_host_list.append((hostname, host['port']))
-
-        logging.info(f'Updated server list. {len(filtered_host_list)} servers (filtered from {len(full_host_list)} '
-                     f'total ET servers), plus {len(additional_host_list)} servers from config.')
-        return list(set(filtered_host_list).union(additional_host_list))
-
-    async def _post_serverstatus(self, host_details):
-        message_embed = discord.Embed(
-            title=f'{config.game_name_display} Servers',
-            colour=int('FFFFFF', 16),
-        )
+                additional_host_list.append((address, host['port']))
+        self._additional_hosts = set(additional_host_list)
+
+        logging.info(f'Updated server list. {len(filtered_hosts)} servers (filtered from {len(listed_hosts)} '
+                     f'total ET servers, {probed_count} probed, {len(backing_off_addresses)} backing off, '
+                     f'{removed_count} no longer listed), plus {len(additional_host_list)} servers from config.')
+        return filtered_hosts.union(HostTable.from_hosts(additional_host_list))
+
+    def _post_serverstatus(self, host_details, as_of=None):
+        # Each distinct filter is evaluated, and each distinct (filter, sort) view rendered, once per sweep however many
+        # outputs share it.
+        matching_host_details = {}  # filter_key -> host_details
+        rendered = {}  # view_key -> (status, significance_key)
+        for output in self._outputs:
+            if output.filter_key not in matching_host_details:
+                matching_host_details[output.filter_key] = [
+                    host_info for host_info in host_details
+                    if (host_info.ip, host_info.port) in self._additional_hosts
+                    or self._host_details_match_filter(host_info, output.server_filter)
+                ]
+            if output.view_key not in rendered:
+                rendered[output.view_key] = self._render_status(
+                    sorted(matching_host_details[output.filter_key], key=output.sort_key), as_of
+                )
+            status, significance_key = rendered[output.view_key]
+            output.publisher.submit(status, significance_key=significance_key)
+
+    def _render_status(self, host_details, as_of=None):
+        # Renders everything but the update time, which is only added when the publisher actually sends the status,
+        # unless the host details are as of an earlier time (a unix timestamp), e.g. those of the warm start snapshot.
+        fields = []
+        populated_hosts = []
         total_players = 0
         for host_info in host_details:
-            player_count = int(host_info['humans'] if 'humans' in host_info else host_info['clients'])
+            player_count = host_info.player_count
             total_players += player_count
             if player_count > 0:
                 icon = ':blue_circle:'
+                populated_hosts.append((host_info.ip, host_info.port))
             else:
                 icon = ':black_circle:'
-            name = f'{icon} {player_count}/{host_info["sv_maxclients"]} | {host_info["hostname_plaintext"]}'
-            message_embed.add_field(
-                name=name,
-                value=f'`+connect {host_info["ip"]}:{host_info["port"]}` | Map: {host_info["mapname"]}',
-                inline=False,
-            )
-        last_updated = datetime.datetime.now(tz=pytz.timezone(config.output_timezone))
+            fields.append((
+                f'{icon} {player_count}/{host_info.sv_maxclients} | {host_info.hostname_plaintext}',
+                f'`+connect {host_info.ip}:{host_info.port}` | Map: {host_info.mapname}',
+            ))
+        return (total_players, tuple(fields), as_of), frozenset(populated_hosts)
+
+    async def _publish_status(self, output, status):
+        total_players, _, as_of = status
+        output_tz = pytz.timezone(config.output_timezone)
+        if as_of is not None:
+            last_updated = datetime.datetime.fromtimestamp(as_of, tz=output_tz)
+        else:
+            last_updated = datetime.datetime.now(tz=output_tz)
         last_updated_str = f'{last_updated.strftime("%a %b %-d %H:%M")} {last_updated.tzname()}'
-        message_embed.description = (
-            f'{total_players} total players online now\n'
-            f'This status list is updated every minute - last update at {last_updated_str}'
-        )
+        message_embed = _build_status_embed(status, last_updated_str)
 
-        logging.info(f'Posting status message. {total_players} players online.')
-        if self._status_message:
-            await self._status_message.edit(embed=message_embed)
-        else:
-            self._status_message = await self._status_channel.send(embed=message_embed)
-
-    async def _query_serverstatus(self):
-        host_list = copy.copy(self._hosts.raw)
-        tasks = []
-        for hostname, port in host_list:
-            tasks.append(self.loop.create_task(self._etclient.get_server_info(hostname, port)))
-        await asyncio.gather(*tasks, return_exceptions=True)
-
-        host_with_task_list = list(zip(host_list, tasks))
-
-        if any(task.exception() for task in tasks):
-            num_failed = sum(bool(task.exception()) for task in tasks)
-            failed_addresses = [
-                f'{hostname}:{port}'
-                for (hostname, port), task
-                in host_with_task_list
-                if task.exception()
-            ]
-            logging.warning(f'{num_failed} failed get_server_info queries: {", ".join(failed_addresses)}')
-
-        host_details = []
-        for (hostname, port), task in host_with_task_list:
-            if task.exception():
-                continue
-            host_info = task.result()
-            host_info['ip'] = hostname
-            host_info['port'] = port
-            host_details.append(host_info)
-
-        return sorted(
-            host_details,
-            key=lambda host_info: (-int(host_info['clients']), host_info['hostname_plaintext'])
-        )
+        logging.info(f'Posting status message to #{output.channel.name}. {total_players} players online.')
+        with metrics.DISCORD_PUBLISH_LATENCY.time():
+            if output.message:
+                await output.message.edit(embed=message_embed)
+            else:
+                output.message = await output.channel.send(embed=message_embed)
+                await self._status_messages.save(output.channel_id, output.message.id)
+        self._sent_last_message_at = datetime.datetime.now(pytz.utc)
+
+    async def _poll_due_hosts(self):
+        now = time.time()
+        if self._hosts.raw is not self._scheduled_host_list:
+            self._scheduled_host_list = self._hosts.raw
+            self._poll_scheduler.sync(self._hosts.raw, lambda host: self._first_poll_at(host, now))
+            for host in [host for host in self._host_details_cache if host not in self._poll_scheduler]:
+                del self._host_details_cache[host]
+                self._players.remove(host)
+
+        host_list = self._poll_scheduler.pop_due(now)
+        if not host_list:
+            return
+
+        # Results are handled as they come in. Hosts that haven't answered by the deadline are left for the next round,
+        # rather than holding up this one.
+        polled = set()
+        failed_addresses = []
+        with metrics.STATUS_SWEEP_DURATION.time():
+            probes = probe_as_completed(
+                self._prober.get_server_info,
+                host_list,
+                concurrency=config.probe_concurrency or PROBE_CONCURRENCY,
+                deadline=STATUS_SWEEP_DEADLINE,
+            )
+            async for host, host_info, exception in probes:
+                polled.add(host)
+                if exception is not None:
+                    failed_addresses.append(f'{host[0]}:{host[1]}')
+                    self._hosts.record_probe(host, False, now)
+                    self._host_details_cache.pop(host, None)
+                    self._players.remove(host)
+                    self._listed_hosts.pop(pack_address(*host), None)
+                    self._poll_scheduler.schedule(host, self._hosts.health[host].next_probe_at)
+                else:
+                    host_info.ip, host_info.port = host
+                    self._hosts.record_probe(host, True, now)
+                    self._host_details_cache[host] = host_info
+                    self._players.update(host, host_info)
+                    address = pack_address(*host)
+                    if address in self._listed_hosts:
+                        self._listed_hosts[address] = (now, self._host_details_match_any_filter(host_info))
+                    self._poll_scheduler.record_players(host, host_info.player_count, now)
+
+        for host in host_list:
+            if host not in polled:
+                # Possibly just queued behind the rate limiter, so not counted as a failure.
+                self._poll_scheduler.schedule(host, time.time())
+
+        if failed_addresses:
+            logging.warning(f'{len(failed_addresses)} failed get_server_info queries: {", ".join(failed_addresses)}')
+
+    def _first_poll_at(self, host, now):
+        health = self._hosts.health.get(host)
+        if health is not None and health.next_probe_at is not None:
+            return health.next_probe_at
+        return now
+
+    def _cached_host_details(self):
+        # Each output sorts these its own way.
+        return list(self._host_details_cache.values())
 
     async def _reply_dm(self, message):
+        match = PLAYER_SEARCH_COMMAND.match(message.content)
+        if match:
+            return self._find_player(match.group('query'))
+
         if message.author in self._users_who_have_seen_help_message:
             return None
         else:
+            channel_names = ', '.join(f'#{output.channel.name}' for output in self._outputs)
             response = (
                 f'Hi there! I provide info on {config.game_name_display} server status. I\'m like the in-game '
                 f'multiplayer server list, but imported into Discord.\n'
                 f'\n'
-                f'You can see my updates on this channel: #{self._status_channel.name}\n'
+                f'You can see my updates on: {channel_names}\n'
+                f'\n'
+                f'To find out which server someone is playing on, ask me "where is <player name>".\n'
                 f'\n'
                 f'For help and support, please reach out to {config.bot_administrator}. Cheers!'
             )
             self._users_who_have_seen_help_message.add(message.author)
             return response
+
+    def _find_player(self, query):
+        # Answered from the player index, kept up to date by the status polls, so no server is probed.
+        sightings = self._players.find(query, limit=PLAYER_SEARCH_MAX_RESULTS + 1)
+        if not sightings:
+            return f'Nobody matching "{query}" is playing on the servers I\'m following right now.'
+        lines = []
+        for sighting in sightings[:PLAYER_SEARCH_MAX_RESULTS]:
+            ip, port = sighting.host
+            lines.append(
+                f'{strip_color_codes(sighting.name)} is on {self._host_details_cache[sighting.host].hostname_plaintext}'
+                f' `+connect {ip}:{port}` (score {sighting.score}, ping {sighting.ping})'
+            )
+        if len(sightings) > PLAYER_SEARCH_MAX_RESULTS:
+            lines.append('...and more, try being more specific.')
+        return '\n'.join(lines)
+
+
+@functools.lru_cache(maxsize=32)
+def _build_status_embed(status, last_updated_str):
+    # Outputs showing the same view share the embed, as long as they publish within the same minute.
+    total_players, fields, _ = status
+    message_embed = discord.Embed(
+        title=f'{config.game_name_display} Servers',
+        colour=int('FFFFFF', 16),
+    )
+    for name, value in fields:
+        message_embed.add_field(name=name, value=value, inline=False)
+    message_embed.description = (
+        f'{total_players} total players online now\n'
+        f'This status list is updated as servers change - last update at {last_updated_str}'
+    )
+    return message_embed
@@ -0,0 +1,76 @@
+import collections
+import mmap
+import socket
+import struct
+import time
+
+CAPTURE_MAGIC = b'ETCAP\x01\n\0'
+# Per datagram: unix time, direction, remote IPv4 address and port, and payload length, followed by the payload.
+CAPTURE_RECORD = struct.Struct('!dBIHH')
+CAPTURE_BUFFER_SIZE = 1024 * 1024
+
+RECEIVED = 0
+SENT = 1
+
+CapturedDatagram = collections.namedtuple('CapturedDatagram', ['timestamp', 'direction', 'addr', 'data'])
+
+
+class CaptureWriter(object):
+    """
+    Appends datagrams to a capture file: CAPTURE_MAGIC followed by CAPTURE_RECORD-prefixed datagrams, as sent and
+    received (including the \\xff\\xff\\xff\\xff header). Writes are buffered, so the file is only complete once closed.
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._file = open(path, 'ab', buffering=CAPTURE_BUFFER_SIZE)
+        if self._file.tell() == 0:
+            self._file.write(CAPTURE_MAGIC)
+
+    def record(self, direction, addr, data):
+        ip, port = addr[:2]
+        self._file.write(CAPTURE_RECORD.pack(
+            self._clock(), direction, int.from_bytes(socket.inet_aton(ip), 'big'), port, len(data)
+        ))
+        self._file.write(data)
+
+    def close(self):
+        self._file.close()
+
+
+class CaptureReader(object):
+    """
+    Reads a capture file through a read-only memory map, so captures of any size can be replayed without loading them.
+    Iterating yields CapturedDatagrams, in capture order. A record truncated by an unclean shutdown ends the capture.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as capture_file:
+            self._mmap = mmap.mmap(capture_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            self._mmap.close()
+            raise ValueError(f'{path} is not an ET capture file.')
+
+    def __iter__(self):
+        capture = self._mmap
+        offset = len(CAPTURE_MAGIC)
+        end = len(capture)
+        while offset + CAPTURE_RECORD.size <= end:
+            timestamp, direction, ip, port, length = CAPTURE_RECORD.unpack_from(capture, offset)
+            offset += CAPTURE_RECORD.size
+            if offset + length > end:
+                break
+            addr = (socket.inet_ntoa(ip.to_bytes(4, 'big')), port)
+            yield CapturedDatagram(timestamp, direction, addr, capture[offset:offset + length])
+            offset += length
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -6,15 +6,39 @@ from json_minify import json_minify
 
 Config = collections.namedtuple(
     'Config',
-    ['bot_administrator', 'status_output_channel', 'output_timezone', 'discord_api_auth_token', 'game_name_display',
-     'server_filter', 'db_url', 'additional_servers']
+    ['bot_administrator', 'output_timezone', 'discord_api_auth_token', 'game_name_display', 'db_url',
+     'additional_servers',
+     # Optional settings
+     'status_output_channel', 'server_filter',  # Unused if outputs is set.
+     'master_servers_required', 'master_query_deadline', 'dead_host_prune_hours', 'metrics_port',
+     'outputs', 'probe_workers', 'probe_concurrency', 'capture_path'],
 )
+# Defaults of the optional settings, set this way as namedtuple's defaults argument needs Python 3.7.
+Config.__new__.__defaults__ = (None, None, None, 8, 72, None, None, None, None, None)
+
+StatusOutputConfig = collections.namedtuple('StatusOutputConfig', ['channel', 'server_filter', 'sort'])
+StatusOutputConfig.__new__.__defaults__ = ({}, 'players')
+
+
+def status_outputs(config):
+    """
+    The configured StatusOutputConfigs, or a single one made of status_output_channel and server_filter if outputs
+    isn't set.
+    """
+    if config.outputs is None:
+        return [StatusOutputConfig(config.status_output_channel, config.server_filter or {})]
+    return [StatusOutputConfig(**output) for output in config.outputs]
 
 
 def load_config():
     CONFIG_PATH = os.environ.get('CONFIG_PATH', 'config.json')
     with open(CONFIG_PATH) as config_file:
-        return Config(**json.loads(json_minify(config_file.read())))
+        config = Config(**json.loads(json_minify(config_file.read())))
+    outputs = status_outputs(config)
+    if not outputs or any(output.channel is None for output in outputs):
+        raise ValueError(f'{CONFIG_PATH}: no status output channel, set status_output_channel or a channel for every '
+                         'entry of outputs.')
+    return config
 
 
 # Global
@@ -1,111 +1,255 @@
+import array
 import asyncio
+import collections
+import collections.abc
 import datetime
+import functools
 import json
 import logging
 import re
-import socket
 import struct
+import types
 
 import asyncio_extras
 
-from .util import split_chunks
+from . import capture, metrics
+from .hosttable import HostTable
+from .ratelimit import TokenBucketRateLimiter
+from .resolver import CachingResolver
+from .rtt import RTTTracker
 
 OUTBOUND_GLOBAL_MAX_THROUGHPUT = 256 * 1024  # Bytes per second
 OUTBOUND_GLOBAL_MAX_PACKET_RATE = 50         # Datagrams per second
 ET_SERVER_RESPONSE_TIMEOUT = datetime.timedelta(seconds=5)
+ET_SERVER_RESPONSE_TRIES = 3
+# infoResponses are reused for this long, so overlapping server list refreshes and status polls don't probe twice.
+SERVER_INFO_CACHE_TTL = datetime.timedelta(seconds=10)
+SERVER_INFO_CACHE_SIZE = 8192
+MASTER_QUERY_DEADLINE = datetime.timedelta(seconds=8)
+# Some masters mark every packet of a multi-packet reply with EOT, so after an EOT only wait this long for stragglers.
+MASTER_RESPONSE_EOT_GRACE = datetime.timedelta(seconds=0.5)
+
+COLOR_CODE_PATTERN = re.compile(r'\^.')
+PLAYER_LINE_PATTERN = re.compile(r'(?P<score>-?\d+) (?P<ping>-?\d+) "(?P<name>.+)"')
+# ServerInfo keys that are derived by the bot rather than sent by the server.
+DERIVED_INFO_KEYS = frozenset(['hostname_plaintext', 'players'])
+
+GETSERVERS_RECORD = struct.Struct('!xIH')
+GETSERVERS_EOT_TERMINATORS = (b'\\EOT\0\0\0', b'\\EOT')
+GETSERVERS_TERMINATORS = GETSERVERS_EOT_TERMINATORS + (b'\\EOF\0\0\0', b'\\EOF')
+
+
+@functools.lru_cache(maxsize=256)
+def _info_pair_pattern(key, value):
+    # \key\value, ended by the next key, the player list or the end of the datagram.
+    return re.compile(
+        rb'\\' + re.escape(str(key).encode()) + rb'\\' + re.escape(str(value).encode()) + rb'(?:[\\\n]|\Z)'
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def strip_color_codes(text):
+    # Memoized, as the same few thousand hostnames are seen over and over.
+    return COLOR_CODE_PATTERN.sub('', text)
+
+
+class ServerInfo(collections.abc.Mapping):
+    """
+    A decoded infoResponse. The keys the bot uses are parsed into typed attributes up front, while the player list is
+    only parsed on first access.
+
+    For compatibility with server_filter and anything else dealing in raw values, it also reads as a Mapping of all the
+    info keys the server reported (plus 'hostname_plaintext' and 'players'), with values as sent, i.e. strings.
+    """
+
+    # Known keys:
+    # 'challenge', 'version', 'protocol', 'hostname', 'serverload', 'mapname', 'clients', 'humans', 'sv_maxclients',
+    # 'gametype', 'pure', 'game', 'friendlyFire', 'maxlives', 'needpass', 'gamename', 'g_antilag', 'weaprestrict',
+    # 'balancedteams'
+
+    __slots__ = ['hostname', 'hostname_plaintext', 'mapname', 'clients', 'humans', 'sv_maxclients', 'ip', 'port',
+                 '_info', '_player_lines', '_players']
+
+    def __init__(self, info, player_lines=()):
+        self._info = info
+        self.hostname = info.get('hostname', '')
+        self.hostname_plaintext = strip_color_codes(self.hostname)
+        self.mapname = info.get('mapname', '')
+        self.clients = int(info.get('clients', 0))
+        humans = info.get('humans')
+        self.humans = int(humans) if humans is not None else None
+        self.sv_maxclients = int(info.get('sv_maxclients', 0))
+        # The address the info was received from, set by the caller.
+        self.ip = None
+        self.port = None
+        self._player_lines = player_lines
+        self._players = None
+
+    @property
+    def player_count(self):
+        # Older servers don't report humans, only clients (which includes bots).
+        return self.humans if self.humans is not None else self.clients
+
+    @property
+    def players(self):
+        # Lines that don't parse are skipped, rather than failing whatever is reading the players.
+        if self._players is None:
+            matches = (PLAYER_LINE_PATTERN.match(player_info_raw) for player_info_raw in self._player_lines)
+            self._players = [match.groupdict() for match in matches if match is not None]
+        return self._players
+
+    @property
+    def player_lines(self):
+        # The player lines as received, e.g. for persisting the info and rebuilding it with ServerInfo(extras, lines).
+        return tuple(self._player_lines)
+
+    @property
+    def extras(self):
+        """
+        Read-only view of all info keys as reported by the server.
+        """
+        return types.MappingProxyType(self._info)
+
+    def to_dict(self):
+        return dict(self)
+
+    def __getitem__(self, key):
+        if key == 'hostname_plaintext':
+            return self.hostname_plaintext
+        if key == 'players':
+            return self.players
+        return self._info[key]
+
+    def __iter__(self):
+        yield from self._info
+        yield 'hostname_plaintext'
+        yield 'players'
+
+    def __len__(self):
+        return len(self._info) + 2
+
+    def __repr__(self):
+        return f'ServerInfo({self.ip}:{self.port}, {self.hostname_plaintext!r}, {self.player_count} players)'
+
+
+class InfoFilter(object):
+    """
+    server_filters compiled into a check of raw infoResponses, so servers that can't match any of them are rejected
+    without decoding their response. A response passes if, for any of the filters, all of its \\key\\value pairs
+    appear in the datagram. As the pairs are only searched for rather than parsed, passing isn't matching: the
+    ServerInfo of a response that passes must still be checked against the filters. Pairs of DERIVED_INFO_KEYS aren't
+    in the datagram, so they're left to that check.
+    """
+
+    def __init__(self, server_filters):
+        self.server_filters = [dict(server_filter) for server_filter in server_filters]
+        self._patterns = [
+            [_info_pair_pattern(key, value) for key, value in server_filter.items() if key not in DERIVED_INFO_KEYS]
+            for server_filter in self.server_filters
+        ]
+
+    def __call__(self, data):
+        # Plain loops, as this runs for every response of a refresh and generator expressions would dominate its cost.
+        for patterns in self._patterns:
+            for pattern in patterns:
+                if pattern.search(data) is None:
+                    break
+            else:
+                return True
+        return False
+
+    def __reduce__(self):
+        # Pickled as its filters, the patterns are recompiled (from _info_pair_pattern's cache) on the other end.
+        return (InfoFilter, (self.server_filters,))
+
+
+class _InfoResponse(object):
+    # A raw infoResponse, only decoded into a ServerInfo on the first host_info() call.
+
+    __slots__ = ['data', '_addr', '_decode', '_host_info']
+
+    def __init__(self, data, addr, decode):
+        self.data = data
+        self._addr = addr
+        self._decode = decode
+        self._host_info = None
+
+    def host_info(self):
+        if self._host_info is None:
+            try:
+                self._host_info = self._decode(self.data)
+            except Exception as e:
+                raise ValueError(f'Malformed infoResponse from {self._addr[0]}:{self._addr[1]}: {e}')
+        return self._host_info
 
 
 class ETClientProtocol(asyncio.DatagramProtocol):
 
     PROTOCOL_VERSION = 84
 
-    # static class vars for rate-limiting global throughput. This makes ETClientProtocol non threadsafe (but still
-    # coroutine-safe).
-    last_sent_message_timestamp = None
-    last_sent_message_length = None
-
-    def __init__(self, loop):
+    def __init__(self, loop, rate_limiter, capture_writer=None):
         self.loop = loop
+        self.rate_limiter = rate_limiter
+        self.capture_writer = capture_writer  # Optional capture.CaptureWriter recording all traffic.
         self.transport = None
         self.message_queue = []
+        self.received_eot = False
         self._waiter = None
 
     def connection_made(self, transport):
         self.transport = transport
 
-    async def send_message(self, data):
-        # Rate-limit sending rate. Note that there is no queueing of messages, so if multiple messages are pending then
-        # it is arbitrary which gets sent first. This works only in the non-RT spike-heavy network conditions of
-        # et_discord_bot.
-        if ETClientProtocol.last_sent_message_timestamp:
-            wait = None
-            while wait is None or wait > 0:
-                interval = max(
-                    ETClientProtocol.last_sent_message_length / OUTBOUND_GLOBAL_MAX_THROUGHPUT,
-                    1 / OUTBOUND_GLOBAL_MAX_PACKET_RATE
-                )
-                wait = (ETClientProtocol.last_sent_message_timestamp + interval) - self.loop.time()
-                if wait > 0:
-                    await asyncio.sleep(wait)
-
+    async def send_message(self, data, addr=None, priority=0):
         full_message = b'\xff\xff\xff\xff' + data
-        self.transport.sendto(full_message)
-        ETClientProtocol.last_sent_message_length = len(full_message)
-        ETClientProtocol.last_sent_message_timestamp = self.loop.time()
+        await self.rate_limiter.acquire(len(full_message), priority)
+        self.transport.sendto(full_message, addr)
+        if self.capture_writer is not None:
+            self.capture_writer.record(capture.SENT, addr or self.transport.get_extra_info('peername'), full_message)
 
     async def send_getservers(self):
         await self.send_message(f'getservers {ETClientProtocol.PROTOCOL_VERSION} empty full'.encode())
 
-    async def send_getinfo(self):
-        await self.send_message('getinfo\n'.encode())
-
-    def decode_dict(self, raw):
-        value = dict()
-        raw_list = raw[1:].split('\\')
-        for i in range(0, len(raw_list), 2):
-            value[raw_list[i]] = raw_list[i + 1]
-        return value
+    async def send_getinfo(self, addr=None):
+        await self.send_message('getinfo\n'.encode(), addr)
 
     def decode_getserversResponse(self, data):
-        servers = []
-        servers_data = data[data.find(b'\\'):data.rfind(b'\\')]
-        servers_data_list = split_chunks(servers_data, 7)
-        for server_raw in servers_data_list:
-            unpacked_ip_and_port = struct.unpack('!BBBBH', server_raw[1:])
-            ip = '.'.join(map(str, unpacked_ip_and_port[:-1]))
-            port = int(unpacked_ip_and_port[-1])
-            servers.append((ip, port))
-        return servers
+        # Decodes all records of the packet in one pass over a memoryview of it, returning the servers as an array of
+        # packed addresses (see pack_address). Each record is a backslash followed by the 4 byte IPv4 address and the 2
+        # byte port, the packet may be terminated by an \EOT or \EOF marker.
+        start = data.find(b'\\')
+        if start < 0:
+            return array.array('Q')
+        end = len(data)
+        for terminator in GETSERVERS_TERMINATORS:
+            if data.endswith(terminator):
+                end -= len(terminator)
+                break
+        end -= (end - start) % GETSERVERS_RECORD.size
+        records = memoryview(data)[start:end]
+        return array.array('Q', [ip << 16 | port for ip, port in GETSERVERS_RECORD.iter_unpack(records)])
 
     def decode_infoResponse(self, data):
         message_parts = data.decode('UTF8', 'replace').split('\n')
-        host_info = self.decode_dict(message_parts[1])
-
-        host_info['hostname_plaintext'] = re.sub(r'\^.', '', host_info['hostname'])
-        logging.debug(json.dumps(host_info, indent=4, sort_keys=True))
-        # Known values:
-        # 'challenge', 'version', 'protocol', 'hostname', 'serverload', 'mapname', 'clients', 'humans', 'sv_maxclients',
-        # 'gametype', 'pure', 'game', 'friendlyFire', 'maxlives', 'needpass', 'gamename', 'g_antilag', 'weaprestrict',
-        # 'balancedteams'
-
-        host_info['players'] = []
-        for player_info_raw in message_parts[2:]:
-            player_info_dict = re.match(r'(?P<score>\d+) (?P<ping>\d+) "(?P<name>.+)"', player_info_raw).groupdict()
-            host_info['players'].append(player_info_dict)
-
+        info_parts = message_parts[1].split('\\')
+        host_info = ServerInfo(dict(zip(info_parts[1::2], info_parts[2::2])), message_parts[2:])
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(json.dumps(host_info.to_dict(), indent=4, sort_keys=True))
         return host_info
 
-    def datagram_received(self, data, _):
-        data = data[4:]  # drop \0xff\0xff\0xff\0xf
-
-        if data.startswith(b'infoResponse'):
+    def datagram_received(self, data, addr):
+        if self.capture_writer is not None:
+            self.capture_writer.record(capture.RECEIVED, addr, data)
+        # Messages start with a \0xff\0xff\0xff\0xf header.
+        if data.startswith(b'infoResponse', 4):
             message_type = 'infoResponse'
-            message_content = self.decode_infoResponse(data)
-        elif data.startswith(b'getserversResponse'):
+            message_content = self.decode_infoResponse(data[4:])
+        elif data.startswith(b'getserversResponse', 4):
             message_type = 'getserversResponse'
             message_content = self.decode_getserversResponse(data)
+            if data.endswith(GETSERVERS_EOT_TERMINATORS):
+                self.received_eot = True
         else:
-            logging.warning(f'Parsing message with first bytes "{data[:20]}" not implemented, ignoring message.')
+            logging.warning(f'Parsing message with first bytes "{data[4:24]}" not implemented, ignoring message.')
             return
 
         logging.debug(f'Received {message_type}')
@@ -136,6 +280,65 @@ class ETClientProtocol(asyncio.DatagramProtocol):
             self._waiter.set_result(None)
 
 
+class ETProbeProtocol(ETClientProtocol):
+    """
+    Unconnected variant of ETClientProtocol shared by all getinfo probes of an ETClient. Instead of a message queue,
+    responses are routed to the futures waiting on their source address, so probing any number of servers only ever
+    uses this one socket. Responses are passed on undecoded, as _InfoResponses.
+    """
+
+    def __init__(self, loop, rate_limiter, capture_writer=None):
+        super().__init__(loop, rate_limiter, capture_writer)
+        self._pending = collections.defaultdict(list)
+
+    def expect_info_response(self, addr):
+        waiter = self.loop.create_future()
+        self._pending[addr].append(waiter)
+        return waiter
+
+    def forget(self, addr, waiter):
+        waiters = self._pending.get(addr)
+        if waiters is None:
+            return
+        if waiter in waiters:
+            waiters.remove(waiter)
+        if not waiters:
+            del self._pending[addr]
+
+    def datagram_received(self, data, addr):
+        if self.capture_writer is not None:
+            self.capture_writer.record(capture.RECEIVED, addr, data)
+        addr = addr[:2]
+        waiters = self._pending.pop(addr, None)
+        if not waiters:
+            logging.debug(f'Ignoring unexpected datagram from {addr[0]}:{addr[1]}.')
+            return
+
+        data = data[4:]  # drop \0xff\0xff\0xff\0xf
+        if not data.startswith(b'infoResponse'):
+            logging.warning(f'Parsing message with first bytes "{data[:20]}" not implemented, ignoring message.')
+            self._pending[addr] = waiters
+            return
+
+        logging.debug('Received infoResponse')
+        response = _InfoResponse(data, addr, self.decode_infoResponse)
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(response)
+
+    def error_received(self, exc):
+        # Unconnected sockets can't attribute ICMP errors to a destination, the affected probes will just time out.
+        logging.warning(f'ETProbeProtocol: Error received: {str(exc)}')
+
+    def connection_lost(self, exc):
+        logging.debug('ETProbeProtocol: Socket closed')
+        pending, self._pending = self._pending, collections.defaultdict(list)
+        for waiters in pending.values():
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(ConnectionError('ETProbeProtocol socket closed'))
+
+
 class ETClient(object):
 
     class UnableToConnectToMasterServersError(Exception):
@@ -147,13 +350,60 @@ class ETClient(object):
         ('master0.etmaster.net', 27950)
     ]
 
-    def __init__(self, loop=None):
+    def __init__(self, loop=None, capture_path=None):
+        """
+        capture_path: if set, all datagrams sent and received are appended to this capture file, see capture.py.
+        """
         self.loop = loop or asyncio.get_event_loop()
+        # Outbound traffic of all of this client's sockets is paced by one shared scheduler.
+        self.rate_limiter = TokenBucketRateLimiter(
+            OUTBOUND_GLOBAL_MAX_THROUGHPUT,
+            OUTBOUND_GLOBAL_MAX_PACKET_RATE,
+            loop=self.loop,
+            name='udp',
+        )
+        self.resolver = CachingResolver(loop=self.loop)
+        self.rtt = RTTTracker(max_timeout=ET_SERVER_RESPONSE_TIMEOUT)
+        self._capture_writer = capture.CaptureWriter(capture_path) if capture_path is not None else None
+        self._probe_endpoint = None
+        self._info_cache = collections.OrderedDict()  # (server, port) -> (received_at, _InfoResponse), in LRU order
+        self._info_in_flight = {}  # (server, port) -> task
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coalesced = 0
+
+    def close(self):
+        endpoint, self._probe_endpoint = self._probe_endpoint, None
+        if endpoint is not None:
+            if endpoint.done():
+                _close_endpoint(endpoint)
+            else:
+                # Still being created, closed in case it completes despite the cancellation.
+                endpoint.cancel()
+                endpoint.add_done_callback(_close_endpoint)
+        if self._capture_writer is not None:
+            self._capture_writer.close()
+            self._capture_writer = None
+
+    async def _get_probe_protocol(self):
+        # All getinfo probes share one unconnected socket, created on first use.
+        if self._probe_endpoint is None:
+            self._probe_endpoint = self.loop.create_task(self.loop.create_datagram_endpoint(
+                lambda: ETProbeProtocol(self.loop, self.rate_limiter, self._capture_writer),
+                local_addr=('0.0.0.0', 0)
+            ))
+        try:
+            _, protocol = await asyncio.shield(self._probe_endpoint)
+        except Exception:
+            self._probe_endpoint = None
+            raise
+        return protocol
 
     @asyncio_extras.async_contextmanager
     async def connect(self, addr):
         transport, protocol = await self.loop.create_datagram_endpoint(
-            lambda: ETClientProtocol(self.loop),
+            lambda: ETClientProtocol(self.loop, self.rate_limiter, self._capture_writer),
             remote_addr=addr
         )
         try:
@@ -161,55 +411,193 @@ class ETClient(object):
         finally:
             transport.close()
 
-    async def get_server_list(self):
-        for master_server_host, master_server_port in self.MASTER_SERVERS:
-            try:
-                servers = await self.query_master_server(
-                    (socket.gethostbyname(master_server_host), master_server_port))
-                return servers
-            except asyncio.TimeoutError:
-                logging.warn(f'Failed to query master server {master_server_host},'
-                             f' trying next alternative...')
-                continue
-        raise self.UnableToConnectToMasterServersError
-
-    async def query_master_server(self, master_server_addr):
-        async with self.connect(master_server_addr) as protocol:
-            try:
-                await protocol.send_getservers()
-
-                while True:
-                    await asyncio.wait_for(protocol.wait_for_message(),
-                                           timeout=ET_SERVER_RESPONSE_TIMEOUT.total_seconds())
-            except asyncio.TimeoutError:
-                if not protocol.message_queue:
-                    raise
-                else:
-                    pass
+    async def get_server_list(self, min_masters=None, deadline=MASTER_QUERY_DEADLINE):
+        """
+        Query all MASTER_SERVERS concurrently and return the merged, deduplicated server list as a HostTable. See
+        stream_server_list.
+        """
+        servers = array.array('Q')
+        async for new_servers in self.stream_server_list(min_masters, deadline):
+            servers.extend(new_servers)
+        return HostTable(servers)
+
+    async def stream_server_list(self, min_masters=None, deadline=MASTER_QUERY_DEADLINE):
+        """
+        Async generator querying all MASTER_SERVERS concurrently, yielding arrays of packed addresses (see
+        pack_address) of servers not yielded before, as the masters' packets arrive. Finishes as soon as min_masters
+        (default: all of them) have completed their reply, or once the deadline has passed.
+        """
+        required = min(min_masters or len(self.MASTER_SERVERS), len(self.MASTER_SERVERS))
+        queue = asyncio.Queue()
+        tasks = [
+            self.loop.create_task(self._pump_master_server(master_server_host, master_server_port, queue))
+            for master_server_host, master_server_port in self.MASTER_SERVERS
+        ]
+        deadline_at = self.loop.time() + deadline.total_seconds()
+        seen = set()
+        answered = 0
+        finished = 0
+        try:
+            while finished < len(tasks) and answered < required:
+                timeout = deadline_at - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event, servers = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if event != 'servers':
+                    finished += 1
+                    answered += event == 'answered'
+                    continue
+                new_servers = array.array('Q', [address for address in servers if address not in seen])
+                seen.update(new_servers)
+                if new_servers:
+                    yield new_servers
+        finally:
+            for task in tasks:
+                task.cancel()
 
-            servers = []
-            for message_type, servers_part in protocol.message_queue:
-                if message_type != 'getserversResponse':
-                    raise ValueError()
-                servers.extend(servers_part)
+        if not answered and not seen:
+            raise self.UnableToConnectToMasterServersError
+        logging.debug(f'{answered}/{len(self.MASTER_SERVERS)} master servers answered, {len(seen)} servers.')
 
-            return servers
+    async def _pump_master_server(self, master_server_host, master_server_port, queue):
+        # Feeds a master's packets into the stream_server_list queue as ('servers', servers) events, followed by an
+        # 'answered' event once its reply is complete or a 'failed' event.
+        started_at = self.loop.time()
+        try:
+            master_server_addr = (await self.resolver.resolve(master_server_host), master_server_port)
+            async for servers in self.stream_master_server(master_server_addr):
+                queue.put_nowait(('servers', servers))
+        except Exception as e:
+            logging.warning(f'Failed to query master server {master_server_host}: {e!r}')
+            outcome = 'failed'
+        else:
+            outcome = 'answered'
+        metrics.MASTER_QUERY_DURATION.labels(master_server_host, outcome).observe(self.loop.time() - started_at)
+        queue.put_nowait((outcome, None))
 
-    async def get_server_info(self, server, port):
-        async with self.connect((server, port)) as protocol:
-            tries = 3
-            while tries > 0:
-                await protocol.send_getinfo()
+    async def query_master_server(self, master_server_addr):
+        servers = array.array('Q')
+        async for servers_part in self.stream_master_server(master_server_addr):
+            servers.extend(servers_part)
+        return HostTable(servers)
+
+    async def stream_master_server(self, master_server_addr):
+        """
+        Async generator yielding the packed addresses of each getserversResponse packet as soon as it is decoded.
+        Finishes MASTER_RESPONSE_EOT_GRACE after an EOT-terminated packet, or once the master has been silent for
+        ET_SERVER_RESPONSE_TIMEOUT.
+        """
+        async with self.connect(master_server_addr) as protocol:
+            await protocol.send_getservers()
+            received_any = False
+            while True:
+                while protocol.message_queue:
+                    message_type, servers = protocol.message_queue.pop(0)
+                    if message_type != 'getserversResponse':
+                        raise ValueError()
+                    received_any = True
+                    yield servers
 
+                if protocol.received_eot:
+                    timeout = MASTER_RESPONSE_EOT_GRACE
+                else:
+                    timeout = ET_SERVER_RESPONSE_TIMEOUT
                 try:
-                    await asyncio.wait_for(protocol.wait_for_message(),
-                                           timeout=ET_SERVER_RESPONSE_TIMEOUT.total_seconds())
+                    await asyncio.wait_for(protocol.wait_for_message(), timeout=timeout.total_seconds())
                 except asyncio.TimeoutError:
-                    tries -= 1
-                    if not tries:
+                    if not received_any:
+                        raise
+                    return
+
+    async def get_server_info(self, server, port, info_filter=None):
+        """
+        Query a server's info. Responses younger than SERVER_INFO_CACHE_TTL are served from cache, and concurrent
+        queries of the same server share one probe. The returned ServerInfo may be shared, so it must not be modified
+        beyond setting its ip and port.
+
+        If info_filter (an InfoFilter) rejects the raw response, None is returned instead, without decoding it.
+        """
+        response = await self._get_info_response(server, port)
+        if info_filter is not None and not info_filter(response.data):
+            metrics.SERVER_INFO_FILTERED.inc()
+            return None
+        return response.host_info()
+
+    async def _get_info_response(self, server, port):
+        addr = (server, port)
+        cached = self._info_cache.get(addr)
+        if cached is not None:
+            received_at, response = cached
+            if self.loop.time() - received_at <= SERVER_INFO_CACHE_TTL.total_seconds():
+                self._info_cache.move_to_end(addr)
+                self.cache_hits += 1
+                metrics.SERVER_INFO_CACHE.labels('hit').inc()
+                return response
+            del self._info_cache[addr]
+
+        probe = self._info_in_flight.get(addr)
+        if probe is None:
+            self.cache_misses += 1
+            metrics.SERVER_INFO_CACHE.labels('miss').inc()
+            probe = self._info_in_flight[addr] = self.loop.create_task(self._probe_server_info(server, port))
+            probe.add_done_callback(functools.partial(self._probe_done, addr))
+        else:
+            self.coalesced += 1
+            metrics.SERVER_INFO_CACHE.labels('coalesced').inc()
+        # Shielded, so a caller giving up doesn't cancel the probe for the others.
+        return await asyncio.shield(probe)
+
+    def cancel_probe(self, server, port):
+        """
+        Cancel the probe of a server in flight, if any, e.g. once nobody is waiting for its response anymore.
+        """
+        probe = self._info_in_flight.get((server, port))
+        if probe is not None:
+            probe.cancel()
+
+    def _probe_done(self, addr, probe):
+        del self._info_in_flight[addr]
+        if probe.cancelled() or probe.exception():
+            return
+        self._info_cache[addr] = (self.loop.time(), probe.result())
+        if len(self._info_cache) > SERVER_INFO_CACHE_SIZE:
+            self._info_cache.popitem(last=False)
+
+    async def _probe_server_info(self, server, port):
+        # Responses are matched to the probe by their source address, so hostnames are resolved to it first.
+        addr = (await self.resolver.resolve(server), port)
+        protocol = await self._get_probe_protocol()
+        waiter = protocol.expect_info_response(addr)
+        try:
+            timeouts = self.rtt.retry_schedule(addr, ET_SERVER_RESPONSE_TRIES)
+            for attempt, timeout in enumerate(timeouts):
+                if attempt > 0:
+                    metrics.PROBE_RETRIES.inc()
+                await protocol.send_getinfo(addr)
+                sent_at = self.loop.time()
+                if attempt == 0:
+                    first_sent_at = sent_at
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(waiter), timeout=timeout)
+                except asyncio.TimeoutError:
+                    if attempt == len(timeouts) - 1:
+                        metrics.PROBE_TIMEOUTS.inc()
                         raise
                 else:
-                    message_type, message_content = protocol.message_queue.pop()
-                    if message_type != 'infoResponse':
-                        raise ValueError()
-                    return message_content
+                    # Karn's algorithm: after a retry it's ambiguous which getinfo the response is for, so only
+                    # first-try responses are sampled.
+                    if attempt == 0:
+                        self.rtt.sample(addr, self.loop.time() - sent_at)
+                    metrics.PROBE_LATENCY.observe(self.loop.time() - first_sent_at)
+                    return response
+        finally:
+            protocol.forget(addr, waiter)
+
+
+def _close_endpoint(endpoint):
+    if not endpoint.cancelled() and endpoint.exception() is None:
+        transport, _ = endpoint.result()
+        transport.close()
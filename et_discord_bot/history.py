@@ -0,0 +1,216 @@
+import array
+import collections
+import datetime
+import logging
+
+from . import metrics
+
+HISTORY_BUFFER_CAPACITY = 64 * 1024  # Samples held in memory between flushes, ~1MB.
+HISTORY_FLUSH_INTERVAL = datetime.timedelta(minutes=15)
+PLAYER_COUNT_MAX = 0xffff  # Counts are stored as unsigned 16 bit ints, anything outside 0..PLAYER_COUNT_MAX is clamped.
+
+# Raw samples are rolled up into 15 minute and then hourly buckets, each table only keeping data for its retention.
+RAW_RETENTION = datetime.timedelta(days=2)
+QUARTER_HOUR_RETENTION = datetime.timedelta(days=35)
+HOURLY_RETENTION = datetime.timedelta(days=400)
+
+
+class SampleRingBuffer(object):
+    """
+    Fixed-capacity, column-oriented buffer of (timestamp, host, humans, clients, map) samples, with hosts and maps
+    stored as indices into the PlayerHistory intern tables. Once full, the oldest samples are overwritten. Player counts
+    are clamped to 0..PLAYER_COUNT_MAX, as servers report whatever they like.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array.array('I', [0]) * capacity
+        self.hosts = array.array('I', [0]) * capacity
+        self.humans = array.array('H', [0]) * capacity
+        self.clients = array.array('H', [0]) * capacity
+        self.maps = array.array('I', [0]) * capacity
+        self.dropped = 0
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, host, humans, clients, map_index):
+        i = (self._start + self._count) % self.capacity
+        if self._count == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+            self.dropped += 1
+        else:
+            self._count += 1
+        self.timestamps[i] = timestamp
+        self.hosts[i] = host
+        self.humans[i] = min(max(humans, 0), PLAYER_COUNT_MAX)
+        self.clients[i] = min(max(clients, 0), PLAYER_COUNT_MAX)
+        self.maps[i] = map_index
+
+    def drain(self):
+        rows = []
+        for n in range(self._count):
+            i = (self._start + n) % self.capacity
+            rows.append((self.timestamps[i], self.hosts[i], self.humans[i], self.clients[i], self.maps[i]))
+        self._start = 0
+        self._count = 0
+        return rows
+
+
+class PlayerHistory(object):
+    """
+    Records the player counts of every status sweep, buffering them in memory and flushing them to the database in
+    batches. Flushing also rolls the raw samples up into 15 minute and hourly buckets and prunes every table past its
+    retention, so disk usage stays bounded no matter how long the bot runs.
+    """
+
+    def __init__(self, db, capacity=HISTORY_BUFFER_CAPACITY, flush_interval=HISTORY_FLUSH_INTERVAL):
+        self._db = db
+        self._buffer = SampleRingBuffer(capacity)
+        self._flush_interval = flush_interval.total_seconds()
+        self._hosts = {}  # (ip, port) -> index
+        self._host_list = []
+        self._maps = {}  # mapname -> index
+        self._map_list = []
+        self._last_flush_timestamp = None
+        self._flush_task = None
+
+    def record(self, host_details, timestamp):
+        """
+        Record a sweep's host_details (ServerInfos with their ip and port set) taken at the given datetime. Schedules a
+        flush when one is due.
+        """
+        timestamp = int(timestamp.timestamp())
+        for host_info in host_details:
+            self._buffer.append(
+                timestamp,
+                _intern(self._hosts, self._host_list, (host_info.ip, host_info.port)),
+                host_info.player_count,
+                host_info.clients,
+                _intern(self._maps, self._map_list, host_info.mapname),
+            )
+
+        if self._last_flush_timestamp is None:
+            self._last_flush_timestamp = timestamp
+        flush_due = (
+            timestamp - self._last_flush_timestamp >= self._flush_interval
+            or len(self._buffer) >= self._buffer.capacity // 2
+        )
+        if flush_due and (self._flush_task is None or self._flush_task.done()):
+            self._last_flush_timestamp = timestamp
+            self._flush_task = self._db.loop.create_task(self._flush_logging_errors())
+
+    async def flush(self):
+        if self._buffer.dropped:
+            logging.warning(f'Player history buffer overflowed, {self._buffer.dropped} samples were dropped.')
+            self._buffer.dropped = 0
+        rows = self._buffer.drain()
+        if rows:
+            with metrics.SQLITE_SAVE_DURATION.labels('player_sample').time():
+                await self._db.run(_write_samples, rows, list(self._host_list), list(self._map_list))
+
+    async def busiest_servers(self, since, limit=10):
+        """
+        The servers with the most player-hours since the given datetime, as a list of (ip, port, player_hours).
+        """
+        await self.flush()
+        return await self._db.run(_query_busiest_servers, int(since.timestamp()), limit)
+
+    async def peak_hours(self, since, tz):
+        """
+        The average total player count per hour of the day (in the timezone tz) since the given datetime, as a list of
+        (hour, average_players), busiest first.
+        """
+        await self.flush()
+        hourly_totals = await self._db.run(_query_hourly_totals, int(since.timestamp()))
+        totals_by_hour = collections.defaultdict(list)
+        for timestamp, players in hourly_totals:
+            hour = datetime.datetime.fromtimestamp(timestamp, tz).hour
+            totals_by_hour[hour].append(players)
+        return sorted(
+            ((hour, sum(totals) / len(totals)) for hour, totals in totals_by_hour.items()),
+            key=lambda hour_average: -hour_average[1]
+        )
+
+    async def _flush_logging_errors(self):
+        try:
+            await self.flush()
+        except Exception:
+            logging.exception('Failed to flush player history.')
+
+
+def _intern(index, values, value):
+    i = index.get(value)
+    if i is None:
+        i = index[value] = len(values)
+        values.append(value)
+    return i
+
+
+def _resolve_ids(conn, table, columns, values):
+    placeholders = ', '.join('?' for _ in columns)
+    column_list = ', '.join(columns)
+    conn.executemany(f'INSERT OR IGNORE INTO {table} ({column_list}) VALUES ({placeholders})', values)
+    ids = {}
+    for row in conn.execute(f'SELECT id, {column_list} FROM {table}'):
+        ids[row[1:] if len(columns) > 1 else row[1]] = row[0]
+    return ids
+
+
+def _write_samples(conn, rows, host_list, map_list):
+    with conn:
+        used_hosts = sorted({host for _, host, _, _, _ in rows})
+        used_maps = sorted({map_index for _, _, _, _, map_index in rows})
+        host_ids = _resolve_ids(conn, 'history_host', ('ip', 'port'), [host_list[i] for i in used_hosts])
+        map_ids = _resolve_ids(conn, 'history_map', ('name',), [(map_list[i],) for i in used_maps])
+        conn.executemany(
+            'INSERT OR REPLACE INTO player_sample (host_id, ts, humans, clients, map_id) VALUES (?, ?, ?, ?, ?)',
+            [
+                (host_ids[host_list[host]], timestamp, humans, clients, map_ids[map_list[map_index]])
+                for timestamp, host, humans, clients, map_index in rows
+            ]
+        )
+
+        # Recompute the rollup buckets touched by the new samples. Buckets are recomputed whole, so the finer table
+        # must always retain at least one bucket's worth of the coarser resolution.
+        oldest = min(timestamp for timestamp, _, _, _, _ in rows)
+        conn.execute(
+            'INSERT OR REPLACE INTO player_sample_15m (host_id, ts, humans_max, humans_avg, clients_max, samples) '
+            'SELECT host_id, ts / 900 * 900 AS bucket, MAX(humans), AVG(humans), MAX(clients), COUNT(*) '
+            'FROM player_sample WHERE ts >= ? GROUP BY host_id, bucket',
+            (oldest // 900 * 900,)
+        )
+        conn.execute(
+            'INSERT OR REPLACE INTO player_sample_1h (host_id, ts, humans_max, humans_avg, clients_max, samples) '
+            'SELECT host_id, ts / 3600 * 3600 AS bucket, MAX(humans_max), SUM(humans_avg * samples) / SUM(samples), '
+            'MAX(clients_max), SUM(samples) '
+            'FROM player_sample_15m WHERE ts >= ? GROUP BY host_id, bucket',
+            (oldest // 3600 * 3600,)
+        )
+
+        newest = max(timestamp for timestamp, _, _, _, _ in rows)
+        for table, retention in [
+            ('player_sample', RAW_RETENTION),
+            ('player_sample_15m', QUARTER_HOUR_RETENTION),
+            ('player_sample_1h', HOURLY_RETENTION),
+        ]:
+            conn.execute(f'DELETE FROM {table} WHERE ts < ?', (newest - int(retention.total_seconds()),))
+
+
+def _query_busiest_servers(conn, since, limit):
+    # Hourly buckets hold the average player count over the hour, so their sum is in player-hours.
+    return conn.execute(
+        'SELECT h.ip, h.port, SUM(s.humans_avg) AS player_hours FROM player_sample_1h s '
+        'JOIN history_host h ON h.id = s.host_id WHERE s.ts >= ? '
+        'GROUP BY s.host_id ORDER BY player_hours DESC LIMIT ?',
+        (since, limit)
+    ).fetchall()
+
+
+def _query_hourly_totals(conn, since):
+    return conn.execute(
+        'SELECT ts, SUM(humans_avg) FROM player_sample_1h WHERE ts >= ? GROUP BY ts ORDER BY ts',
+        (since,)
+    ).fetchall()
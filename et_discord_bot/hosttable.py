@@ -0,0 +1,93 @@
+import array
+import itertools
+import socket
+
+
+def pack_address(ip, port):
+    """
+    Pack an IPv4 address and port into a single int, (ip << 16 | port), as used by the compact server lists.
+    """
+    return int.from_bytes(socket.inet_aton(ip), 'big') << 16 | port
+
+
+def unpack_address(address):
+    return socket.inet_ntoa((address >> 16).to_bytes(4, 'big')), address & 0xffff
+
+
+class HostTable(object):
+    """
+    An immutable, ordered set of IPv4 hosts, stored as an array of packed addresses (see pack_address) instead of
+    (ip, port) tuples: 8 bytes a host, rather than a tuple, a str and an int. Iterating yields (ip, port) tuples, which
+    are only formatted as they're reached, while packed() exposes the array itself.
+
+    Membership tests and the set operations go through an index of the packed addresses, built on first use. As tables
+    are never modified, they can be shared (e.g. as both the current and the last saved host list) without copying.
+    """
+
+    __slots__ = ['_addresses', '_index']
+
+    def __init__(self, addresses=()):
+        """
+        addresses: an iterable of packed addresses, duplicates are dropped.
+        """
+        self._addresses = array.array('Q', dict.fromkeys(addresses))
+        self._index = None
+
+    @classmethod
+    def from_hosts(cls, hosts):
+        """
+        A table of hosts, an iterable of (ip, port).
+        """
+        if isinstance(hosts, cls):
+            return hosts
+        return cls(pack_address(ip, port) for ip, port in hosts)
+
+    @classmethod
+    def _from_unique(cls, addresses):
+        table = cls.__new__(cls)
+        table._addresses = addresses
+        table._index = None
+        return table
+
+    def packed(self):
+        """
+        A read-only view of the packed addresses, in order.
+        """
+        # Over a copy, as memoryview.toreadonly needs Python 3.8.
+        return memoryview(self._addresses.tobytes()).cast('Q')
+
+    def union(self, other):
+        index = self._get_index()
+        addresses = array.array('Q', self._addresses)
+        addresses.extend(itertools.filterfalse(index.__contains__, other._addresses))
+        return self._from_unique(addresses)
+
+    def difference(self, other):
+        index = other._get_index()
+        return self._from_unique(array.array('Q', itertools.filterfalse(index.__contains__, self._addresses)))
+
+    def intersection(self, other):
+        index = other._get_index()
+        return self._from_unique(array.array('Q', filter(index.__contains__, self._addresses)))
+
+    __or__ = union
+    __sub__ = difference
+    __and__ = intersection
+
+    def __contains__(self, host):
+        ip, port = host
+        return pack_address(ip, port) in self._get_index()
+
+    def __iter__(self):
+        return map(unpack_address, self._addresses)
+
+    def __len__(self):
+        return len(self._addresses)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({len(self)} hosts)'
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = frozenset(self._addresses)
+        return self._index
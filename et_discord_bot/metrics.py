@@ -0,0 +1,272 @@
+import asyncio
+import bisect
+import contextlib
+import datetime
+import logging
+import math
+import time
+
+METRICS_BIND_HOST = '0.0.0.0'
+METRICS_REQUEST_TIMEOUT = datetime.timedelta(seconds=5)
+EVENT_LOOP_LAG_INTERVAL = datetime.timedelta(seconds=1)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Registry(object):
+    """
+    A set of metrics, rendered together in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return ''.join(metric.render() for metric in self._metrics)
+
+
+class _Metric(object):
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}  # label values -> child
+
+    def labels(self, *values):
+        """
+        The child metric for the given label values, in labelnames order.
+        """
+        assert(len(values) == len(self.labelnames))
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}\n', f'# TYPE {self.name} {self.type}\n']
+        for values, child in sorted(self._children.items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+            lines.extend(child.render(self.name, labels))
+        return ''.join(lines)
+
+    def _new_child(self):
+        raise NotImplementedError()
+
+
+class _CounterValue(object):
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self, name, labels):
+        return [f'{name}{_format_labels(labels)} {_format_value(self.value)}\n']
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _new_child(self):
+        return _CounterValue()
+
+
+class _GaugeValue(_CounterValue):
+
+    def set(self, value):
+        self.value = value
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _new_child(self):
+        return _GaugeValue()
+
+
+class _HistogramValue(object):
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf.
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @contextlib.contextmanager
+    def time(self):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at)
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == math.inf else _format_value(bound)
+            bucket_labels = _format_labels(labels + ['le="' + le + '"'])
+            lines.append(f'{name}_bucket{bucket_labels} {cumulative}\n')
+        lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(self.sum)}\n')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}\n')
+        return lines
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# Global
+REGISTRY = Registry()
+
+PROBE_LATENCY = REGISTRY.register(Histogram(
+    'et_probe_latency_seconds', 'Time from the first getinfo sent to its infoResponse, including retries.'
+))
+PROBE_RETRIES = REGISTRY.register(Counter('et_probe_retries_total', 'getinfo requests resent after a timeout.'))
+PROBE_TIMEOUTS = REGISTRY.register(Counter('et_probe_timeouts_total', 'Probes unanswered after all tries.'))
+SERVER_INFO_CACHE = REGISTRY.register(Counter(
+    'et_server_info_cache_total', 'get_server_info calls by result: served from cache (hit), sharing a probe in flight '
+    '(coalesced) or probing (miss).', labelnames=('result',)
+))
+SERVER_INFO_FILTERED = REGISTRY.register(Counter(
+    'et_server_info_filtered_total', 'infoResponses rejected by a server filter without being decoded.'
+))
+RATE_LIMITER_WAIT = REGISTRY.register(Histogram(
+    'et_rate_limiter_wait_seconds', 'Time spent queued in a rate limiter before sending.', labelnames=('limiter',)
+))
+MASTER_QUERY_DURATION = REGISTRY.register(Histogram(
+    'et_master_query_duration_seconds', 'Time to receive a master server\'s full server list.',
+    labelnames=('master', 'outcome'), buckets=DURATION_BUCKETS
+))
+SERVER_LIST_REFRESH_DURATION = REGISTRY.register(Histogram(
+    'et_server_list_refresh_duration_seconds', 'Time to query the master servers and probe every listed server.',
+    buckets=DURATION_BUCKETS
+))
+STATUS_SWEEP_DURATION = REGISTRY.register(Histogram(
+    'et_status_sweep_duration_seconds', 'Time to poll a round of due hosts.', buckets=DURATION_BUCKETS
+))
+DISCORD_PUBLISH_LATENCY = REGISTRY.register(Histogram(
+    'et_discord_publish_latency_seconds', 'Time to send or edit the status message.'
+))
+DISCORD_RATE_LIMITED = REGISTRY.register(Counter(
+    'et_discord_rate_limited_total', 'Requests Discord answered with 429 Too Many Requests.'
+))
+SQLITE_SAVE_DURATION = REGISTRY.register(Histogram(
+    'et_sqlite_save_duration_seconds', 'Time to write to the database, including queueing for its thread.',
+    labelnames=('table',)
+))
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    'et_event_loop_lag_seconds', 'How late the event loop runs a callback scheduled for a given time.'
+))
+
+
+class MetricsServer(object):
+    """
+    Minimal HTTP server exposing the registry at /metrics, and is_healthy() at /healthz (200 when healthy, 503
+    otherwise). Also measures event loop lag while running.
+    """
+
+    def __init__(self, port, is_healthy, loop=None, host=METRICS_BIND_HOST, registry=REGISTRY):
+        self.loop = loop or asyncio.get_event_loop()
+        self.port = port
+        self.host = host
+        self._is_healthy = is_healthy
+        self._registry = registry
+        self._server = None
+        self._lag_monitor = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._lag_monitor = self.loop.create_task(monitor_event_loop_lag(self.loop))
+        logging.info(f'Serving metrics on port {self.port}.')
+
+    def close(self):
+        if self._lag_monitor is not None:
+            self._lag_monitor.cancel()
+            self._lag_monitor = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), METRICS_REQUEST_TIMEOUT.total_seconds())
+            _, target, _ = request_line.decode('latin-1').split(' ', 2)
+            path = target.split('?', 1)[0]
+            if path == '/metrics':
+                status, content_type, body = '200 OK', 'text/plain; version=0.0.4', self._registry.render()
+            elif path == '/healthz':
+                if self._is_healthy():
+                    status, content_type, body = '200 OK', 'text/plain', 'ok\n'
+                else:
+                    status, content_type, body = '503 Service Unavailable', 'text/plain', 'unhealthy\n'
+            else:
+                status, content_type, body = '404 Not Found', 'text/plain', 'not found\n'
+            body = body.encode()
+            writer.write(
+                f'HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n'
+                f'Connection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def monitor_event_loop_lag(loop, interval=EVENT_LOOP_LAG_INTERVAL):
+    interval = interval.total_seconds()
+    while True:
+        scheduled_at = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - scheduled_at, 0.0))
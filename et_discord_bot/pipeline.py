@@ -0,0 +1,83 @@
+import asyncio
+
+PROBE_CONCURRENCY = 256  # Probes in flight at once, more simply queue in the rate limiter.
+
+
+class _SourceDone(object):
+
+    def __init__(self, exception=None):
+        self.exception = exception
+
+
+async def probe_as_completed(probe, hosts, concurrency=PROBE_CONCURRENCY, deadline=None, loop=None):
+    """
+    Async generator running probe(ip, port) for each (ip, port) of hosts, with at most concurrency probes in flight,
+    yielding (host, result, exception) as each one completes. hosts may be an iterable or an async iterable, which is
+    only consumed as the window has room, so memory and task count stay bounded however many hosts there are.
+
+    Stops once every host has been probed, or once deadline (a timedelta) has passed, in which case the remaining
+    probes are cancelled and their hosts aren't yielded. Probes are also cancelled if the consumer stops early, as
+    long as it closes the generator (or is cancelled itself). An exception raised by hosts is re-raised.
+    """
+    loop = loop or asyncio.get_event_loop()
+    deadline_at = loop.time() + deadline.total_seconds() if deadline is not None else None
+    window = asyncio.Semaphore(concurrency)
+    results = asyncio.Queue()
+    in_flight = set()
+    started = 0
+
+    async def run_probe(host):
+        try:
+            result = (host, await probe(*host), None)
+        except Exception as e:
+            result = (host, None, e)
+        finally:
+            window.release()
+        results.put_nowait(result)
+
+    async def feed():
+        try:
+            if hasattr(hosts, '__aiter__'):
+                async for host in hosts:
+                    await start_probe(host)
+            else:
+                for host in hosts:
+                    await start_probe(host)
+        except Exception as e:
+            results.put_nowait(_SourceDone(e))
+        else:
+            results.put_nowait(_SourceDone())
+
+    async def start_probe(host):
+        nonlocal started
+        await window.acquire()
+        started += 1
+        task = loop.create_task(run_probe(host))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    feeder = loop.create_task(feed())
+    try:
+        # Every started probe puts its result in the queue, the source's end is queued after its last start.
+        source_done = False
+        yielded = 0
+        while not (source_done and yielded == started):
+            timeout = None if deadline_at is None else deadline_at - loop.time()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(results.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if isinstance(item, _SourceDone):
+                if item.exception is not None:
+                    raise item.exception
+                source_done = True
+                continue
+            yielded += 1
+            yield item
+    finally:
+        feeder.cancel()
+        for task in list(in_flight):
+            task.cancel()
+        await asyncio.gather(feeder, *in_flight, return_exceptions=True)
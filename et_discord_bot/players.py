@@ -0,0 +1,124 @@
+import bisect
+import collections
+import logging
+
+from .etwolf_client import strip_color_codes
+
+TRIGRAM_LENGTH = 3
+
+PlayerSighting = collections.namedtuple('PlayerSighting', ['name', 'host', 'score', 'ping'])
+
+
+def normalize_player_name(name):
+    return strip_color_codes(name).strip().casefold()
+
+
+def _trigrams(text):
+    return {text[i:i + TRIGRAM_LENGTH] for i in range(len(text) - TRIGRAM_LENGTH + 1)}
+
+
+class PlayerIndex(object):
+    """
+    In-memory index of the players on the polled servers, by normalized name (color codes stripped, case-folded).
+    Updated per host from each poll, only touching the names that joined or left, and queried by exact name, prefix
+    (over a sorted list of the names) or substring (over an index of the names' trigrams).
+    """
+
+    def __init__(self):
+        self._host_lines = {}  # (ip, port) -> player lines, as of the last update
+        self._host_players = {}  # (ip, port) -> {normalized name -> PlayerSighting}
+        self._name_hosts = {}  # normalized name -> set of (ip, port)
+        self._sorted_names = []
+        self._trigram_names = collections.defaultdict(set)  # trigram -> set of normalized names
+
+    def __len__(self):
+        return len(self._name_hosts)
+
+    def update(self, host, host_info):
+        """
+        Replace host's players with those of host_info. Players that can't be read are skipped (and logged), so one
+        server's bad reply can't fail the caller's poll of every other server.
+        """
+        try:
+            player_lines = host_info.player_lines
+            host_players = list(host_info.players)
+        except Exception as e:
+            logging.warning(f'Failed to read the players of {host[0]}:{host[1]}: {e!r}')
+            player_lines, host_players = None, []
+        if player_lines is not None and self._host_lines.get(host) == player_lines:
+            return
+        self._host_lines[host] = player_lines
+        players = {}
+        skipped_count = 0
+        for player in host_players:
+            try:
+                players[normalize_player_name(player['name'])] = PlayerSighting(
+                    player['name'], host, int(player['score']), int(player['ping'])
+                )
+            except (KeyError, TypeError, ValueError):
+                skipped_count += 1
+        if skipped_count:
+            logging.warning(f'Skipped {skipped_count} unreadable players of {host[0]}:{host[1]}.')
+        players.pop('', None)
+        previous = self._host_players.get(host, {})
+        self._host_players[host] = players
+        for name in previous.keys() - players.keys():
+            self._remove_name_host(name, host)
+        for name in players.keys() - previous.keys():
+            self._add_name_host(name, host)
+
+    def remove(self, host):
+        self._host_lines.pop(host, None)
+        for name in self._host_players.pop(host, {}):
+            self._remove_name_host(name, host)
+
+    def find(self, query, limit=None):
+        """
+        PlayerSightings of the players whose normalized name matches query: exact matches first, then prefix matches,
+        then those containing it, each alphabetically.
+        """
+        query = normalize_player_name(query)
+        if not query:
+            return []
+        names = [query] if query in self._name_hosts else []
+        i = bisect.bisect_left(self._sorted_names, query)
+        while i < len(self._sorted_names) and self._sorted_names[i].startswith(query):
+            if self._sorted_names[i] != query:
+                names.append(self._sorted_names[i])
+            i += 1
+        if len(query) < TRIGRAM_LENGTH:
+            candidates = self._sorted_names
+        else:
+            trigram_names = [self._trigram_names.get(trigram, set()) for trigram in _trigrams(query)]
+            candidates = sorted(set.intersection(*trigram_names))
+        names.extend(name for name in candidates if query in name and not name.startswith(query))
+
+        sightings = []
+        for name in names:
+            for host in sorted(self._name_hosts[name]):
+                sightings.append(self._host_players[host][name])
+                if limit is not None and len(sightings) >= limit:
+                    return sightings
+        return sightings
+
+    def _add_name_host(self, name, host):
+        hosts = self._name_hosts.get(name)
+        if hosts is None:
+            hosts = self._name_hosts[name] = set()
+            bisect.insort(self._sorted_names, name)
+            for trigram in _trigrams(name):
+                self._trigram_names[trigram].add(name)
+        hosts.add(host)
+
+    def _remove_name_host(self, name, host):
+        hosts = self._name_hosts[name]
+        hosts.discard(host)
+        if hosts:
+            return
+        del self._name_hosts[name]
+        del self._sorted_names[bisect.bisect_left(self._sorted_names, name)]
+        for trigram in _trigrams(name):
+            names = self._trigram_names[trigram]
+            names.discard(name)
+            if not names:
+                del self._trigram_names[trigram]
@@ -0,0 +1,108 @@
+import asyncio
+import datetime
+import logging
+
+from .ratelimit import TokenBucketRateLimiter
+
+PUBLISH_MIN_INTERVAL = datetime.timedelta(seconds=60)
+PUBLISH_KEEPALIVE_INTERVAL = datetime.timedelta(minutes=4)
+PUBLISH_RETRY_DELAY = datetime.timedelta(seconds=5)
+# Discord allows roughly 5 message edits per 5 seconds per channel.
+DISCORD_EDIT_RATE = 1    # Edits per second
+DISCORD_EDIT_BURST = 5
+
+
+class StatusPublisher(object):
+    """
+    Decides when a rendered status actually needs to be sent to Discord. Content identical to what was last published is
+    skipped (apart from a keepalive edit every keepalive_interval, so the displayed update time doesn't go stale),
+    ordinary changes are coalesced to at most one edit per min_interval, and significant changes - a change of the
+    significance key, e.g. the set of populated servers - are published right away. Edits go out one at a time from a
+    single worker task, paced to stay within Discord's per-channel rate limit.
+
+    content must be comparable with ==, and must not include anything that changes on every render, like timestamps.
+    publish is a coroutine function called with the content to publish.
+    """
+
+    def __init__(self, publish, loop=None, min_interval=PUBLISH_MIN_INTERVAL,
+                 keepalive_interval=PUBLISH_KEEPALIVE_INTERVAL):
+        self.loop = loop or asyncio.get_event_loop()
+        self.min_interval = min_interval.total_seconds()
+        self.keepalive_interval = keepalive_interval.total_seconds()
+        self.rate_limiter = TokenBucketRateLimiter(
+            bytes_per_second=1,  # Edits are only limited by count, and acquired with a size of 0.
+            packets_per_second=DISCORD_EDIT_RATE,
+            packet_burst=DISCORD_EDIT_BURST,
+            loop=self.loop,
+            name='discord',
+        )
+        self._publish = publish
+        self._pending = None  # (content, significance_key)
+        self._published_content = None
+        self._published_key = None
+        self._published_at = None
+        self._wakeup = None
+        self._worker = None
+
+        self.published = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def submit(self, content, significance_key=None):
+        now = self.loop.time()
+        keepalive_due = self._published_at is None or now - self._published_at >= self.keepalive_interval
+        if content == self._published_content and not keepalive_due:
+            # Anything still pending has been superseded by a state that is already published.
+            self._pending = None
+            self.skipped += 1
+            return
+
+        if self._pending is not None:
+            self.coalesced += 1
+        self._pending = (content, significance_key)
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = self.loop.create_task(self._run())
+        self._wakeup.set()
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending is not None:
+                _, significance_key = self._pending
+                if significance_key == self._published_key and self._published_at is not None:
+                    delay = self._published_at + self.min_interval - self.loop.time()
+                    if delay > 0:
+                        # Wait out the rest of the interval, unless a newer (possibly significant) status comes in.
+                        try:
+                            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                        except asyncio.TimeoutError:
+                            pass
+                        self._wakeup.clear()
+                        continue
+
+                await self.rate_limiter.acquire(0)
+                if self._pending is None:
+                    break
+                content, significance_key = self._pending
+                self._pending = None
+                try:
+                    await self._publish(content)
+                except Exception:
+                    logging.exception('Failed to publish status, retrying.')
+                    self.failed += 1
+                    if self._pending is None:
+                        self._pending = (content, significance_key)
+                    await asyncio.sleep(PUBLISH_RETRY_DELAY.total_seconds())
+                    continue
+                self.published += 1
+                self._published_content = content
+                self._published_key = significance_key
+                self._published_at = self.loop.time()
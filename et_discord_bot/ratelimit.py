@@ -0,0 +1,122 @@
+import asyncio
+import heapq
+import itertools
+
+from . import metrics
+
+
+class TokenBucketRateLimiter(object):
+    """
+    Send scheduler enforcing both a bytes-per-second and a packets-per-second limit. Senders wait in a queue ordered by
+    (priority, arrival) and are released one at a time by a single timer armed for the head of the queue, so however
+    many coroutines are waiting there is at most one wakeup per send slot.
+
+    Wait times are also reported to the et_rate_limiter_wait_seconds metric, labelled with name.
+    """
+
+    def __init__(self, bytes_per_second, packets_per_second, loop=None, byte_burst=None, packet_burst=1,
+                 name='default'):
+        self.loop = loop or asyncio.get_event_loop()
+        self._wait_metric = metrics.RATE_LIMITER_WAIT.labels(name)
+        self._byte_rate = bytes_per_second
+        self._packet_rate = packets_per_second
+        self._byte_capacity = byte_burst or bytes_per_second
+        self._packet_capacity = packet_burst
+        self._byte_tokens = self._byte_capacity
+        self._packet_tokens = self._packet_capacity
+        self._refilled_at = self.loop.time()
+
+        self._queue = []  # heap of (priority, seq, nbytes, future, enqueued_at)
+        self._seq = itertools.count()
+        self._timer = None
+
+        self.sent_packets = 0
+        self.sent_bytes = 0
+        self.waited_packets = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def queue_depth(self):
+        return sum(not future.done() for _, _, _, future, _ in self._queue)
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth,
+            'sent_packets': self.sent_packets,
+            'sent_bytes': self.sent_bytes,
+            'waited_packets': self.waited_packets,
+            'total_wait_time': self.total_wait_time,
+            'mean_wait_time': self.total_wait_time / self.waited_packets if self.waited_packets else 0.0,
+            'max_wait_time': self.max_wait_time,
+        }
+
+    async def acquire(self, nbytes, priority=0):
+        """
+        Wait until a datagram of nbytes may be sent. Lower priority values are served first, equal priorities in FIFO
+        order.
+        """
+        if not self._queue:
+            self._refill()
+            if self._has_tokens_for(nbytes):
+                self._consume(nbytes, 0.0)
+                return
+
+        future = self.loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), nbytes, future, self.loop.time()))
+        if self._queue[0][3] is future:
+            # New head of the queue, the armed timer (if any) may now be for the wrong packet size.
+            self._schedule()
+        await future
+
+    def _refill(self):
+        now = self.loop.time()
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._byte_tokens = min(self._byte_capacity, self._byte_tokens + elapsed * self._byte_rate)
+        self._packet_tokens = min(self._packet_capacity, self._packet_tokens + elapsed * self._packet_rate)
+
+    def _byte_cost(self, nbytes):
+        # Datagrams larger than the bucket only need a full bucket, otherwise they could never be sent.
+        return min(nbytes, self._byte_capacity)
+
+    def _has_tokens_for(self, nbytes):
+        return self._packet_tokens >= 1 and self._byte_tokens >= self._byte_cost(nbytes)
+
+    def _consume(self, nbytes, waited):
+        self._packet_tokens -= 1
+        self._byte_tokens -= self._byte_cost(nbytes)
+        self.sent_packets += 1
+        self.sent_bytes += nbytes
+        self._wait_metric.observe(waited)
+        if waited > 0:
+            self.waited_packets += 1
+            self.total_wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        while self._queue:
+            _, _, nbytes, future, enqueued_at = self._queue[0]
+            if future.done():
+                # Waiter was cancelled while queued.
+                heapq.heappop(self._queue)
+                continue
+            if self._has_tokens_for(nbytes):
+                heapq.heappop(self._queue)
+                self._consume(nbytes, self.loop.time() - enqueued_at)
+                future.set_result(None)
+                continue
+            delay = max(
+                (1 - self._packet_tokens) / self._packet_rate,
+                (self._byte_cost(nbytes) - self._byte_tokens) / self._byte_rate,
+            )
+            self._timer = self.loop.call_later(max(delay, 0), self._on_timer)
+            break
+
+    def _on_timer(self):
+        self._timer = None
+        self._schedule()
@@ -0,0 +1,68 @@
+import asyncio
+import datetime
+import logging
+import socket
+
+DNS_CACHE_TTL = datetime.timedelta(minutes=30)
+DNS_MAX_STALE = datetime.timedelta(days=1)
+
+
+class CachingResolver(object):
+    """
+    Non-blocking IPv4 name resolution through loop.getaddrinfo, with an in-memory cache. getaddrinfo doesn't expose the
+    records' TTLs, so entries are considered fresh for a fixed ttl. If re-resolving an expired entry fails, the stale
+    address keeps being served for up to max_stale instead of failing.
+    """
+
+    def __init__(self, loop=None, ttl=DNS_CACHE_TTL, max_stale=DNS_MAX_STALE):
+        self.loop = loop or asyncio.get_event_loop()
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._cache = {}  # hostname -> (address, resolved_at)
+        self._inflight = {}  # hostname -> Task
+
+    async def resolve(self, hostname):
+        if _is_ipv4_address(hostname):
+            return hostname
+
+        cached = self._cache.get(hostname)
+        now = self.loop.time()
+        if cached and now - cached[1] < self.ttl.total_seconds():
+            return cached[0]
+
+        # Concurrent lookups of the same name share one getaddrinfo call.
+        task = self._inflight.get(hostname)
+        if task is None:
+            task = self.loop.create_task(self._lookup(hostname))
+            self._inflight[hostname] = task
+            task.add_done_callback(lambda _: self._inflight.pop(hostname, None))
+        try:
+            return await asyncio.shield(task)
+        except (OSError, IndexError) as e:
+            if cached and now - cached[1] < self.max_stale.total_seconds():
+                logging.warning(f'Failed to resolve {hostname} ({e!r}), using stale address {cached[0]}.')
+                return cached[0]
+            raise
+
+    async def resolve_all(self, hostnames):
+        """
+        Resolve all hostnames concurrently. Returns a dict of hostname to address, or to the exception if resolving it
+        failed.
+        """
+        hostnames = list(dict.fromkeys(hostnames))
+        results = await asyncio.gather(*[self.resolve(hostname) for hostname in hostnames], return_exceptions=True)
+        return dict(zip(hostnames, results))
+
+    async def _lookup(self, hostname):
+        addrinfo = await self.loop.getaddrinfo(hostname, None, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        address = addrinfo[0][4][0]
+        self._cache[hostname] = (address, self.loop.time())
+        return address
+
+
+def _is_ipv4_address(hostname):
+    try:
+        socket.inet_pton(socket.AF_INET, hostname)
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,60 @@
+import datetime
+
+RTT_INITIAL_TIMEOUT = datetime.timedelta(seconds=1)
+RTT_MIN_TIMEOUT = datetime.timedelta(seconds=0.5)
+RTT_MAX_TIMEOUT = datetime.timedelta(seconds=5)
+
+
+class RTTTracker(object):
+    """
+    Per-host round trip time estimates, used to derive each host's response timeout the way TCP derives its
+    retransmission timeout (RFC 6298): a smoothed RTT plus four times the RTT variance, clamped to
+    [min_timeout, max_timeout], doubling with every retry.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self, initial_timeout=RTT_INITIAL_TIMEOUT, min_timeout=RTT_MIN_TIMEOUT, max_timeout=RTT_MAX_TIMEOUT):
+        self.initial_timeout = initial_timeout.total_seconds()
+        self.min_timeout = min_timeout.total_seconds()
+        self.max_timeout = max_timeout.total_seconds()
+        self._estimates = {}  # (ip, port) -> [srtt, rttvar]
+
+    def sample(self, addr, rtt):
+        estimate = self._estimates.get(addr)
+        if estimate is None:
+            self._estimates[addr] = [rtt, rtt / 2]
+            return
+        srtt, rttvar = estimate
+        estimate[1] = (1 - self.BETA) * rttvar + self.BETA * abs(srtt - rtt)
+        estimate[0] = (1 - self.ALPHA) * srtt + self.ALPHA * rtt
+
+    def timeout(self, addr):
+        estimate = self._estimates.get(addr)
+        if estimate is None:
+            return self.initial_timeout
+        srtt, rttvar = estimate
+        return min(max(srtt + 4 * rttvar, self.min_timeout), self.max_timeout)
+
+    def retry_schedule(self, addr, tries):
+        timeout = self.timeout(addr)
+        return [min(timeout * 2 ** i, self.max_timeout) for i in range(tries)]
+
+    def estimate(self, addr):
+        """
+        The (srtt, rttvar) estimate of a host, None if it has no samples.
+        """
+        estimate = self._estimates.get(addr)
+        return tuple(estimate) if estimate is not None else None
+
+    def forget(self, addr):
+        self._estimates.pop(addr, None)
+
+    def items(self):
+        for (ip, port), (srtt, rttvar) in self._estimates.items():
+            yield ip, port, srtt, rttvar
+
+    def load(self, rows):
+        for ip, port, srtt, rttvar in rows:
+            self._estimates[(ip, port)] = [srtt, rttvar]
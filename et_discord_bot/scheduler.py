@@ -0,0 +1,80 @@
+import datetime
+import heapq
+import itertools
+
+POLL_INTERVAL_CHANGING = datetime.timedelta(seconds=20)
+POLL_INTERVAL_POPULATED = datetime.timedelta(seconds=60)
+POLL_INTERVAL_EMPTY = datetime.timedelta(minutes=5)
+
+
+class PollScheduler(object):
+    """
+    Decides when each host is polled next, using a heap keyed on next-due time. Hosts whose player count changed since
+    their previous poll are polled most often, populated hosts at the regular status rate and empty hosts rarely.
+    Times are unix timestamps.
+    """
+
+    def __init__(self, changing_interval=POLL_INTERVAL_CHANGING, populated_interval=POLL_INTERVAL_POPULATED,
+                 empty_interval=POLL_INTERVAL_EMPTY):
+        self.changing_interval = changing_interval.total_seconds()
+        self.populated_interval = populated_interval.total_seconds()
+        self.empty_interval = empty_interval.total_seconds()
+        self._heap = []  # (due_at, seq, host), superseded entries are skipped lazily
+        self._due_at = {}  # host -> due_at
+        self._player_counts = {}  # host -> player count at the previous poll
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._due_at)
+
+    def __contains__(self, host):
+        return host in self._due_at
+
+    def schedule(self, host, due_at):
+        self._due_at[host] = due_at
+        heapq.heappush(self._heap, (due_at, next(self._seq), host))
+
+    def remove(self, host):
+        self._due_at.pop(host, None)
+        self._player_counts.pop(host, None)
+
+    def sync(self, hosts, due_at):
+        """
+        Make the scheduled hosts match hosts. Hosts not scheduled yet are added, due at due_at(host).
+        """
+        hosts = set(hosts)
+        for host in [host for host in self._due_at if host not in hosts]:
+            self.remove(host)
+        for host in hosts:
+            if host not in self._due_at:
+                self.schedule(host, due_at(host))
+
+    def pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, host = heapq.heappop(self._heap)
+            if self._due_at.get(host) != due_at:
+                continue
+            del self._due_at[host]
+            due.append(host)
+        # Drop superseded entries from the top, so next_due_at is accurate.
+        while self._heap and self._due_at.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return due
+
+    def next_due_at(self):
+        return self._heap[0][0] if self._heap else None
+
+    def record_players(self, host, player_count, now):
+        """
+        Reschedule a successfully polled host according to its player count.
+        """
+        previous_count = self._player_counts.get(host)
+        self._player_counts[host] = player_count
+        if previous_count is not None and previous_count != player_count:
+            interval = self.changing_interval
+        elif player_count > 0:
+            interval = self.populated_interval
+        else:
+            interval = self.empty_interval
+        self.schedule(host, now + interval)
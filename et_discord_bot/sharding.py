@@ -0,0 +1,310 @@
+import asyncio
+import bisect
+import collections
+import hashlib
+import logging
+import multiprocessing
+import pickle
+import socket
+import struct
+
+from .etwolf_client import ETClient, OUTBOUND_GLOBAL_MAX_PACKET_RATE, OUTBOUND_GLOBAL_MAX_THROUGHPUT
+from .ratelimit import TokenBucketRateLimiter
+from .rtt import RTTTracker
+
+CONSISTENT_HASH_REPLICAS = 100  # Points per worker on the ring, more spread hosts more evenly.
+FRAME_HEADER = struct.Struct('!I')
+
+
+class ConsistentHashRing(object):
+    """
+    Maps keys onto nodes such that changing the number of nodes only moves the keys of the added or removed nodes.
+    Hashing is stable across processes and runs, unlike hash().
+    """
+
+    def __init__(self, nodes, replicas=CONSISTENT_HASH_REPLICAS):
+        points = sorted(
+            (_stable_hash(f'{node}-{replica}'), node)
+            for node in nodes for replica in range(replicas)
+        )
+        self._hashes = [point_hash for point_hash, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        i = bisect.bisect(self._hashes, _stable_hash(key)) % len(self._hashes)
+        return self._nodes[i]
+
+
+class ProbeShardPool(object):
+    """
+    Runs get_server_info probes in a pool of worker processes, each with its own ETClient and event loop, so datagram
+    handling and parsing don't compete with the main loop. Hosts are assigned to workers by consistent hashing, so each
+    host is always probed (and has its RTT tracked) by the same worker. Workers talk to the main process over Unix
+    socketpairs, with pickled, length-prefixed frames.
+
+    rtt mirrors the workers' RTT estimates, so they can be loaded, saved and forgotten like an ETClient's: estimates
+    loaded before start() are handed to the workers owning their hosts, each probe result brings back the host's
+    current estimate, and forgetting a host forgets it in its worker too.
+
+    The outbound rate limits are split evenly between the workers and the main process, whose ETClient (still sending
+    the master queries) should be given main_rate_limiter(). A request whose caller gives up is cancelled in its
+    worker. With a capture_path, each worker captures its traffic to capture_path suffixed with its number.
+    """
+
+    class WorkerDiedError(Exception):
+        pass
+
+    def __init__(self, worker_count, loop=None, bytes_per_second=OUTBOUND_GLOBAL_MAX_THROUGHPUT,
+                 packets_per_second=OUTBOUND_GLOBAL_MAX_PACKET_RATE, capture_path=None):
+        self.loop = loop or asyncio.get_event_loop()
+        self.worker_count = worker_count
+        self.rtt = _ShardedRTTTracker(self)
+        self._bytes_per_second = bytes_per_second / (worker_count + 1)
+        self._packets_per_second = packets_per_second / (worker_count + 1)
+        self._capture_path = capture_path
+        self._ring = ConsistentHashRing(range(worker_count))
+        self._processes = []
+        self._connections = []
+
+    def is_healthy(self):
+        return all(connection.alive for connection in self._connections)
+
+    def main_rate_limiter(self):
+        """
+        A rate limiter of the main process' share of the outbound rate limits.
+        """
+        return TokenBucketRateLimiter(self._bytes_per_second, self._packets_per_second, loop=self.loop, name='udp')
+
+    async def start(self):
+        context = multiprocessing.get_context('spawn')  # Forking a process with a running event loop isn't safe.
+        rtt_rows = collections.defaultdict(list)
+        for ip, port, srtt, rttvar in self.rtt.items():
+            rtt_rows[self._ring.node_for(f'{ip}:{port}')].append((ip, port, srtt, rttvar))
+        for i in range(self.worker_count):
+            parent_sock, child_sock = socket.socketpair()
+            capture_path = f'{self._capture_path}.{i}' if self._capture_path is not None else None
+            process = context.Process(
+                target=_worker_main,
+                args=(child_sock, self._bytes_per_second, self._packets_per_second, capture_path),
+                name=f'probe-worker-{i}',
+                daemon=True,
+            )
+            process.start()
+            child_sock.close()
+            _, connection = await self.loop.create_unix_connection(
+                lambda: _ShardConnection(self.loop, f'probe-worker-{i}', self.rtt),
+                sock=parent_sock
+            )
+            connection.send_message(('load_rtt', None, rtt_rows[i]))
+            self._processes.append(process)
+            self._connections.append(connection)
+        for connection in self._connections:
+            await connection.ready
+
+    async def get_server_info(self, server, port, info_filter=None):
+        return await self._connection_for(server, port).request(server, port, info_filter)
+
+    def _forget_rtt(self, addr):
+        connection = self._connection_for(*addr) if self._connections else None
+        if connection is not None and connection.alive:
+            connection.send_message(('forget_rtt', None, addr))
+
+    def _connection_for(self, server, port):
+        return self._connections[self._ring.node_for(f'{server}:{port}')]
+
+    def close(self):
+        for connection in self._connections:
+            connection.close()
+        for process in self._processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        self._connections = []
+        self._processes = []
+
+
+class _ShardedRTTTracker(RTTTracker):
+    # ProbeShardPool.rtt, updated from the workers' probe results rather than sampled.
+
+    def __init__(self, pool):
+        super().__init__()
+        self._pool = pool
+
+    def forget(self, addr):
+        super().forget(addr)
+        self._pool._forget_rtt(addr)
+
+
+class _FramedProtocol(asyncio.Protocol):
+    """
+    Reassembles the FRAME_HEADER length-prefixed pickles arriving on a stream, passing each to message_received.
+    """
+
+    def __init__(self):
+        self.transport = None
+        self._buffer = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self._buffer.extend(data)
+        offset = 0
+        while len(self._buffer) - offset >= FRAME_HEADER.size:
+            length, = FRAME_HEADER.unpack_from(self._buffer, offset)
+            if len(self._buffer) - offset - FRAME_HEADER.size < length:
+                break
+            start = offset + FRAME_HEADER.size
+            self.message_received(pickle.loads(self._buffer[start:start + length]))
+            offset = start + length
+        del self._buffer[:offset]
+
+    def send_message(self, message):
+        payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        self.transport.write(FRAME_HEADER.pack(len(payload)) + payload)
+
+    def message_received(self, message):
+        raise NotImplementedError()
+
+
+class _ShardConnection(_FramedProtocol):
+    # The main process' end of a worker's socketpair.
+
+    def __init__(self, loop, name, rtt):
+        super().__init__()
+        self.loop = loop
+        self.name = name
+        self._rtt = rtt
+        self.alive = True
+        self.ready = loop.create_future()  # Done once the worker is serving.
+        self._pending = {}  # request id -> future
+        self._next_request_id = 0
+
+    async def request(self, server, port, info_filter):
+        if not self.alive:
+            raise ProbeShardPool.WorkerDiedError(self.name)
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        future = self._pending[request_id] = self.loop.create_future()
+        self.send_message(('probe', request_id, (server, port, info_filter)))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if self.alive:
+                self.send_message(('cancel', request_id, None))
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    def message_received(self, message):
+        kind, request_id, value = message
+        if kind == 'ready':
+            self.ready.set_result(None)
+            return
+        future = self._pending.get(request_id)
+        if future is None or future.done():
+            return
+        if kind == 'result':
+            host_info, rtt_row = value
+            if rtt_row is not None:
+                self._rtt.load([rtt_row])
+            future.set_result(host_info)
+        else:
+            future.set_exception(value)
+
+    def close(self):
+        self.alive = False
+        if self.transport is not None:
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        if self.alive:
+            logging.error(f'Lost connection to {self.name}: {exc!r}')
+        self.alive = False
+        if not self.ready.done():
+            self.ready.set_exception(ProbeShardPool.WorkerDiedError(self.name))
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ProbeShardPool.WorkerDiedError(self.name))
+
+
+class _WorkerProtocol(_FramedProtocol):
+    # The worker's end of the socketpair, serving probes with its own ETClient.
+
+    def __init__(self, client, closed):
+        super().__init__()
+        self._client = client
+        self._closed = closed
+        self._requests = {}  # request id -> (task, (server, port))
+
+    def connection_made(self, transport):
+        super().connection_made(transport)
+        self.send_message(('ready', None, None))
+
+    def message_received(self, message):
+        kind, request_id, value = message
+        if kind == 'probe':
+            server, port, info_filter = value
+            task = self._client.loop.create_task(self._probe(request_id, server, port, info_filter))
+            self._requests[request_id] = (task, (server, port))
+            task.add_done_callback(lambda _: self._requests.pop(request_id, None))
+        elif kind == 'cancel':
+            self._cancel(request_id)
+        elif kind == 'load_rtt':
+            self._client.rtt.load(value)
+        elif kind == 'forget_rtt':
+            self._client.rtt.forget(tuple(value))
+
+    def _cancel(self, request_id):
+        task, addr = self._requests.pop(request_id, (None, None))
+        if task is None:
+            return
+        task.cancel()
+        # The probe itself is shared by every request of the host, so it's only cancelled with the last of them.
+        if all(other_addr != addr for _, other_addr in self._requests.values()):
+            self._client.cancel_probe(*addr)
+
+    async def _probe(self, request_id, server, port, info_filter):
+        try:
+            host_info = await self._client.get_server_info(server, port, info_filter)
+            response = ('result', request_id, (host_info, _rtt_row(self._client.rtt, (server, port))))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            response = ('error', request_id, e)
+        if self.transport.is_closing():
+            return
+        try:
+            self.send_message(response)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self.send_message(('error', request_id, RuntimeError(repr(response[2]))))
+
+    def connection_lost(self, exc):
+        for task, _ in list(self._requests.values()):
+            task.cancel()
+        self._closed.set_result(None)
+
+
+def _worker_main(sock, bytes_per_second, packets_per_second, capture_path):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    client = ETClient(loop, capture_path=capture_path)
+    client.rate_limiter = TokenBucketRateLimiter(bytes_per_second, packets_per_second, loop=loop, name='udp')
+    closed = loop.create_future()
+    try:
+        loop.run_until_complete(loop.create_unix_connection(lambda: _WorkerProtocol(client, closed), sock=sock))
+        loop.run_until_complete(closed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+        loop.close()
+
+
+def _rtt_row(rtt, addr):
+    estimate = rtt.estimate(addr)
+    return (addr[0], addr[1]) + estimate if estimate is not None else None
+
+
+def _stable_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
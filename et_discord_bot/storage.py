@@ -0,0 +1,323 @@
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import logging
+import sqlite3
+
+from . import metrics
+from .etwolf_client import ServerInfo
+from .hosttable import HostTable
+
+HOST_PROBE_BACKOFF_BASE = datetime.timedelta(minutes=1)
+HOST_PROBE_BACKOFF_MAX = datetime.timedelta(hours=1)
+
+
+class Database(object):
+    """
+    A long-lived SQLite connection owned by a dedicated executor thread. All queries go through run(), which executes
+    them on that thread, so disk I/O never blocks the event loop.
+    """
+
+    def __init__(self, db_url, loop=None):
+        assert(db_url.startswith('sqlite://'))  # No other DBMSes supported right now
+        self.loop = loop or asyncio.get_event_loop()
+        self._sqlite_db_path = db_url.replace('sqlite://', '')
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self._conn = None
+
+    async def run(self, func, *args):
+        """
+        Run func(connection, *args) on the database thread and return its result.
+        """
+        return await self.loop.run_in_executor(self._executor, self._call, func, args)
+
+    def close(self):
+        self._executor.submit(self._close)
+        self._executor.shutdown(wait=True)
+
+    def _call(self, func, args):
+        if self._conn is None:
+            self._conn = self._connect()
+        return func(self._conn, *args)
+
+    def _connect(self):
+        conn = sqlite3.connect(self._sqlite_db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with conn:
+            _migrate(conn)
+        return conn
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _migrate(conn):
+    conn.execute('CREATE TABLE IF NOT EXISTS host (id INTEGER PRIMARY KEY, ip TEXT, port INT, active INT)')
+    conn.execute('CREATE TABLE IF NOT EXISTS host_rtt (ip TEXT, port INT, srtt REAL, rttvar REAL, '
+                 'PRIMARY KEY (ip, port))')
+    has_unique_index = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='host_ip_port'"
+    ).fetchone()
+    if not has_unique_index:
+        # Databases from before the unique index may contain duplicates, keep the oldest row of each address.
+        duplicates = conn.execute(
+            'DELETE FROM host WHERE id NOT IN (SELECT MIN(id) FROM host GROUP BY ip, port)'
+        ).rowcount
+        if duplicates:
+            logging.info(f'Removed {duplicates} duplicate host rows.')
+        conn.execute('CREATE UNIQUE INDEX host_ip_port ON host (ip, port)')
+
+    host_columns = {row[1] for row in conn.execute('PRAGMA table_info(host)')}
+    for column in ('failures', 'failing_since', 'last_seen', 'next_probe_at'):
+        if column not in host_columns:
+            conn.execute(f'ALTER TABLE host ADD COLUMN {column} INT')
+
+    # Warm start state, the latest info of the active hosts and the status message of each output channel.
+    conn.execute('CREATE TABLE IF NOT EXISTS host_snapshot (ip TEXT, port INT, info TEXT, player_lines TEXT, '
+                 'PRIMARY KEY (ip, port))')
+    conn.execute('CREATE TABLE IF NOT EXISTS host_snapshot_time (id INTEGER PRIMARY KEY CHECK (id = 0), saved_at REAL)')
+    conn.execute('CREATE TABLE IF NOT EXISTS status_message (channel_id INT PRIMARY KEY, message_id INT)')
+
+    # Player history, see history.PlayerHistory.
+    conn.execute('CREATE TABLE IF NOT EXISTS history_host (id INTEGER PRIMARY KEY, ip TEXT, port INT, '
+                 'UNIQUE (ip, port))')
+    conn.execute('CREATE TABLE IF NOT EXISTS history_map (id INTEGER PRIMARY KEY, name TEXT UNIQUE)')
+    conn.execute('CREATE TABLE IF NOT EXISTS player_sample (host_id INT, ts INT, humans INT, clients INT, map_id INT, '
+                 'PRIMARY KEY (host_id, ts)) WITHOUT ROWID')
+    for table in ('player_sample_15m', 'player_sample_1h'):
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (host_id INT, ts INT, humans_max INT, humans_avg REAL, '
+                     f'clients_max INT, samples INT, PRIMARY KEY (host_id, ts)) WITHOUT ROWID')
+    for table in ('player_sample', 'player_sample_15m', 'player_sample_1h'):
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_ts ON {table} (ts)')
+
+
+class HostHealth(object):
+    """
+    Probe outcome tracking of a single host. All times are unix timestamps.
+    """
+
+    __slots__ = ['failures', 'failing_since', 'last_seen', 'next_probe_at']
+
+    def __init__(self, failures=0, failing_since=None, last_seen=None, next_probe_at=None):
+        self.failures = failures
+        self.failing_since = failing_since
+        self.last_seen = last_seen
+        self.next_probe_at = next_probe_at
+
+
+class HostManagerModel(object):
+    """
+    The active hosts (raw, a HostTable), plus the probe health of every host probed so far. Hosts that keep failing are
+    probed with exponential backoff, and are pruned once they have been failing for longer than the dead period.
+
+    Saves are incremental, only writing the hosts that changed since the last save or load.
+    """
+
+    def __init__(self, db):
+        self._raw = HostTable()
+        self.health = {}  # (ip, port) -> HostHealth
+        self._db = db
+        self._pruned = set()
+        self._dirty = set()  # Hosts whose health changed since the last save.
+        self._saved_active = HostTable()  # The active hosts as of the last save or load.
+        self._saved_snapshot = {}  # (ip, port) -> (info, player_lines) JSON, as of the last snapshot save or load
+
+    @property
+    def raw(self):
+        return self._raw
+
+    @raw.setter
+    def raw(self, hosts):
+        self._raw = HostTable.from_hosts(hosts)
+
+    def probe_due(self, host, now):
+        health = self.health.get(host)
+        return health is None or health.next_probe_at is None or health.next_probe_at <= now
+
+    def record_probe(self, host, succeeded, now):
+        health = self.health.get(host)
+        if health is None:
+            health = self.health[host] = HostHealth()
+        self._pruned.discard(host)
+        self._dirty.add(host)
+        if succeeded:
+            health.failures = 0
+            health.failing_since = None
+            health.last_seen = now
+            health.next_probe_at = None
+        else:
+            health.failures += 1
+            if health.failing_since is None:
+                health.failing_since = now
+            backoff = min(
+                HOST_PROBE_BACKOFF_BASE.total_seconds() * 2 ** (health.failures - 1),
+                HOST_PROBE_BACKOFF_MAX.total_seconds()
+            )
+            health.next_probe_at = now + backoff
+
+    def prune_dead(self, now, dead_period):
+        """
+        Forget hosts that have been failing for longer than dead_period, returning them. Pruned hosts are deleted from
+        the database on the next save.
+        """
+        dead = {
+            host
+            for host, health in self.health.items()
+            if health.failing_since is not None and now - health.failing_since > dead_period.total_seconds()
+        }
+        for host in dead:
+            del self.health[host]
+        self.raw = self.raw.difference(HostTable.from_hosts(dead))
+        self._pruned.update(dead)
+        return dead
+
+    async def save(self):
+        active = self.raw
+        saved_active = self._saved_active
+        pruned, self._pruned = self._pruned, set()
+        dirty, self._dirty = self._dirty, set()
+        rows = []
+        for ip, port in (set(active.difference(saved_active)) | dirty) - pruned:
+            health = self.health.get((ip, port)) or HostHealth()
+            rows.append((ip, port, (ip, port) in active, health.failures, health.failing_since, health.last_seen,
+                         health.next_probe_at))
+        deactivated = [host for host in saved_active.difference(active) if host not in pruned]
+        try:
+            with metrics.SQLITE_SAVE_DURATION.labels('host').time():
+                await self._db.run(self._save, rows, deactivated, list(pruned))
+        except Exception:
+            self._pruned |= pruned
+            self._dirty |= dirty
+            raise
+        self._saved_active = active
+
+    async def load(self):
+        rows = await self._db.run(self._load)
+        self.raw = [(ip, port) for ip, port, active, *_ in rows if active]
+        self._saved_active = self.raw
+        self._dirty = set()
+        self.health = {
+            (ip, port): HostHealth(failures or 0, failing_since, last_seen, next_probe_at)
+            for ip, port, _, failures, failing_since, last_seen, next_probe_at in rows
+            if failures is not None
+        }
+
+    async def save_rtt(self, rtt_rows):
+        with metrics.SQLITE_SAVE_DURATION.labels('host_rtt').time():
+            await self._db.run(self._save_rtt, list(rtt_rows))
+
+    async def load_rtt(self):
+        return await self._db.run(self._load_rtt)
+
+    async def save_snapshot(self, host_details, saved_at):
+        """
+        Replace the saved snapshot with host_details, ServerInfos with their ip and port set, as of saved_at (a unix
+        timestamp). Only the hosts that changed since the last save or load are written.
+        """
+        snapshot = {
+            (host_info.ip, host_info.port): (json.dumps(dict(host_info.extras)), json.dumps(host_info.player_lines))
+            for host_info in host_details
+        }
+        saved_snapshot = self._saved_snapshot
+        rows = [
+            (ip, port, info, player_lines)
+            for (ip, port), (info, player_lines) in snapshot.items()
+            if saved_snapshot.get((ip, port)) != (info, player_lines)
+        ]
+        removed = [host for host in saved_snapshot if host not in snapshot]
+        with metrics.SQLITE_SAVE_DURATION.labels('host_snapshot').time():
+            await self._db.run(self._save_snapshot, rows, removed, saved_at)
+        self._saved_snapshot = snapshot
+
+    async def load_snapshot(self):
+        """
+        The saved snapshot, as (host_details, saved_at), saved_at being None if there is none.
+        """
+        rows, saved_at = await self._db.run(self._load_snapshot)
+        host_details = []
+        for ip, port, info, player_lines in rows:
+            host_info = ServerInfo(json.loads(info), json.loads(player_lines))
+            host_info.ip = ip
+            host_info.port = port
+            host_details.append(host_info)
+        self._saved_snapshot = {(ip, port): (info, player_lines) for ip, port, info, player_lines in rows}
+        return host_details, saved_at
+
+    @staticmethod
+    def _save(conn, rows, deactivated, pruned):
+        with conn:
+            conn.executemany('UPDATE host SET active=0 WHERE ip=? AND port=?', deactivated)
+            conn.executemany(
+                'INSERT INTO host (ip, port, active, failures, failing_since, last_seen, next_probe_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (ip, port) DO UPDATE SET active=excluded.active, '
+                'failures=excluded.failures, failing_since=excluded.failing_since, last_seen=excluded.last_seen, '
+                'next_probe_at=excluded.next_probe_at',
+                rows
+            )
+            conn.executemany('DELETE FROM host WHERE ip=? AND port=?', pruned)
+            conn.executemany('DELETE FROM host_rtt WHERE ip=? AND port=?', pruned)
+
+    @staticmethod
+    def _load(conn):
+        return conn.execute(
+            'SELECT ip, port, active, failures, failing_since, last_seen, next_probe_at FROM host'
+        ).fetchall()
+
+    @staticmethod
+    def _save_rtt(conn, rtt_rows):
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO host_rtt (ip, port, srtt, rttvar) VALUES (?, ?, ?, ?)', rtt_rows)
+
+    @staticmethod
+    def _load_rtt(conn):
+        return conn.execute('SELECT ip, port, srtt, rttvar FROM host_rtt').fetchall()
+
+    @staticmethod
+    def _save_snapshot(conn, rows, removed, saved_at):
+        with conn:
+            conn.executemany('DELETE FROM host_snapshot WHERE ip=? AND port=?', removed)
+            conn.executemany(
+                'INSERT OR REPLACE INTO host_snapshot (ip, port, info, player_lines) VALUES (?, ?, ?, ?)', rows
+            )
+            conn.execute('INSERT OR REPLACE INTO host_snapshot_time (id, saved_at) VALUES (0, ?)', (saved_at,))
+
+    @staticmethod
+    def _load_snapshot(conn):
+        rows = conn.execute('SELECT ip, port, info, player_lines FROM host_snapshot').fetchall()
+        saved_at = conn.execute('SELECT saved_at FROM host_snapshot_time').fetchone()
+        return rows, saved_at[0] if saved_at is not None else None
+
+
+class StatusMessageModel(object):
+    """
+    The ID of the bot's status message in each output channel, so it can be fetched directly on startup.
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    async def save(self, channel_id, message_id):
+        await self._db.run(self._save, channel_id, message_id)
+
+    async def load(self):
+        """
+        The saved message IDs, as a dict of channel ID -> message ID.
+        """
+        return dict(await self._db.run(self._load))
+
+    @staticmethod
+    def _save(conn, channel_id, message_id):
+        with conn:
+            conn.execute(
+                'INSERT INTO status_message (channel_id, message_id) VALUES (?, ?) '
+                'ON CONFLICT (channel_id) DO UPDATE SET message_id=excluded.message_id',
+                (channel_id, message_id)
+            )
+
+    @staticmethod
+    def _load(conn):
+        return conn.execute('SELECT channel_id, message_id FROM status_message').fetchall()
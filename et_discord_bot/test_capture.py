@@ -0,0 +1,45 @@
+import asyncio
+
+from et_discord_bot.capture import RECEIVED, SENT, CapturedDatagram, CaptureReader, CaptureWriter
+from et_discord_bot.etwolf_client import ETClient
+from et_discord_bot.test_etwolf_client import GETINFO_RESPONSE, MockETServerProtocol
+
+
+class TestCapture(object):
+
+    def test_roundtrip(self, tmp_path):
+        path = tmp_path / 'traffic.etcap'
+        writer = CaptureWriter(path, clock=iter([1.0, 2.5, 3.0]).__next__)
+        writer.record(SENT, ('192.0.2.1', 27960), b'\xff\xff\xff\xffgetinfo\n')
+        writer.record(RECEIVED, ('192.0.2.1', 27960, 0, 0), GETINFO_RESPONSE)
+        writer.close()
+        writer = CaptureWriter(path, clock=lambda: 4.0)  # Appends.
+        writer.record(RECEIVED, ('192.0.2.2', 27961), b'')
+        writer.close()
+        with open(path, 'ab') as capture_file:
+            capture_file.write(b'\0' * 5)  # A truncated record, as left by an unclean shutdown.
+
+        with CaptureReader(path) as reader:
+            datagrams = list(reader)
+
+        assert(datagrams == [
+            CapturedDatagram(1.0, SENT, ('192.0.2.1', 27960), b'\xff\xff\xff\xffgetinfo\n'),
+            CapturedDatagram(2.5, RECEIVED, ('192.0.2.1', 27960), GETINFO_RESPONSE),
+            CapturedDatagram(4.0, RECEIVED, ('192.0.2.2', 27961), b''),
+        ])
+
+    def test_client_captures_traffic(self, tmp_path):
+        loop = asyncio.get_event_loop()
+        listen = loop.create_datagram_endpoint(MockETServerProtocol, local_addr=('127.0.0.1', 47706))
+        transport, _ = loop.run_until_complete(listen)
+        client = ETClient(capture_path=tmp_path / 'traffic.etcap')
+        loop.run_until_complete(client.get_server_info('127.0.0.1', 47706))
+        client.close()
+        transport.close()
+
+        with CaptureReader(tmp_path / 'traffic.etcap') as reader:
+            datagrams = [(datagram.direction, datagram.addr, datagram.data) for datagram in reader]
+        assert(datagrams == [
+            (SENT, ('127.0.0.1', 47706), b'\xff\xff\xff\xffgetinfo\n'),
+            (RECEIVED, ('127.0.0.1', 47706), GETINFO_RESPONSE),
+        ])
@@ -0,0 +1,55 @@
+import asyncio
+import datetime
+
+import pytz
+
+from et_discord_bot.etwolf_client import ServerInfo
+from et_discord_bot.history import PlayerHistory, SampleRingBuffer
+from et_discord_bot.storage import Database
+
+
+def host_info(ip, humans, mapname='oasis'):
+    host_info = ServerInfo({'humans': str(humans), 'clients': str(humans), 'mapname': mapname})
+    host_info.ip = ip
+    host_info.port = 27960
+    return host_info
+
+
+class TestSampleRingBuffer(object):
+
+    def test_overwrites_oldest(self):
+        buffer = SampleRingBuffer(capacity=3)
+        for i in range(5):
+            buffer.append(i, 0, i, i, 0)
+        assert(len(buffer) == 3)
+        assert(buffer.dropped == 2)
+        assert([row[0] for row in buffer.drain()] == [2, 3, 4])
+        assert(len(buffer) == 0)
+
+    def test_clamps_player_counts(self):
+        buffer = SampleRingBuffer(capacity=2)
+        buffer.append(0, 0, -1, 70000, 0)
+        assert(buffer.drain() == [(0, 0, 0, 0xffff, 0)])
+
+
+class TestPlayerHistory(object):
+
+    def test_rollups_and_queries(self, tmp_path):
+        loop = asyncio.get_event_loop()
+        db = Database(f'sqlite://{tmp_path / "data.db"}', loop=loop)
+        history = PlayerHistory(db, flush_interval=datetime.timedelta(days=1))
+
+        start = datetime.datetime(2020, 6, 1, 18, 0, tzinfo=pytz.utc)
+        for minute in range(120):
+            busy_players = 20 if minute < 60 else 10
+            history.record(
+                [host_info('192.0.2.1', busy_players), host_info('192.0.2.2', 2, mapname='radar')],
+                start + datetime.timedelta(minutes=minute),
+            )
+
+        busiest = loop.run_until_complete(history.busiest_servers(since=start))
+        peak_hours = loop.run_until_complete(history.peak_hours(since=start, tz=pytz.utc))
+        db.close()
+
+        assert(busiest == [('192.0.2.1', 27960, 30.0), ('192.0.2.2', 27960, 4.0)])
+        assert(peak_hours == [(18, 22.0), (19, 12.0)])
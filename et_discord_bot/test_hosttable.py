@@ -0,0 +1,23 @@
+from et_discord_bot.hosttable import HostTable, pack_address
+
+
+class TestHostTable(object):
+
+    def test_packed_roundtrip(self):
+        hosts = [('192.0.2.1', 27960), ('192.0.2.2', 27961), ('192.0.2.1', 27960)]
+        table = HostTable.from_hosts(hosts)
+        assert(list(table) == hosts[:2])
+        assert(len(table) == 2)
+        assert(list(table.packed()) == [pack_address('192.0.2.1', 27960), pack_address('192.0.2.2', 27961)])
+        assert(('192.0.2.2', 27961) in table)
+        assert(('192.0.2.2', 27960) not in table)
+        assert(HostTable.from_hosts(table) is table)
+
+    def test_set_operations(self):
+        old = HostTable.from_hosts([('192.0.2.1', 27960), ('192.0.2.2', 27960), ('192.0.2.3', 27960)])
+        new = HostTable.from_hosts([('192.0.2.3', 27960), ('192.0.2.4', 27960), ('192.0.2.1', 27960)])
+        assert(list(new - old) == [('192.0.2.4', 27960)])
+        assert(list(old - new) == [('192.0.2.2', 27960)])
+        assert(list(old & new) == [('192.0.2.1', 27960), ('192.0.2.3', 27960)])
+        assert(list(old | new) == [('192.0.2.1', 27960), ('192.0.2.2', 27960), ('192.0.2.3', 27960),
+                                   ('192.0.2.4', 27960)])
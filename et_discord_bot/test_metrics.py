@@ -0,0 +1,66 @@
+import asyncio
+
+from et_discord_bot.metrics import Counter, Histogram, MetricsServer, Registry
+
+
+class TestRegistry(object):
+
+    def test_render(self):
+        registry = Registry()
+        counter = registry.register(Counter('test_total', 'A counter.'))
+        histogram = registry.register(Histogram('test_seconds', 'A histogram.', labelnames=('kind',), buckets=(1, 5)))
+        counter.inc()
+        counter.inc(2)
+        histogram.labels('a').observe(0.5)
+        histogram.labels('a').observe(3)
+        histogram.labels('a').observe(10)
+
+        assert(registry.render() == (
+            '# HELP test_total A counter.\n'
+            '# TYPE test_total counter\n'
+            'test_total 3\n'
+            '# HELP test_seconds A histogram.\n'
+            '# TYPE test_seconds histogram\n'
+            'test_seconds_bucket{kind="a",le="1"} 1\n'
+            'test_seconds_bucket{kind="a",le="5"} 2\n'
+            'test_seconds_bucket{kind="a",le="+Inf"} 3\n'
+            'test_seconds_sum{kind="a"} 13.5\n'
+            'test_seconds_count{kind="a"} 3\n'
+        ))
+
+
+class TestMetricsServer(object):
+
+    def test_endpoints(self):
+        loop = asyncio.get_event_loop()
+        registry = Registry()
+        registry.register(Counter('test_total', 'A counter.')).inc()
+        healthy = [True]
+        server = MetricsServer(0, lambda: healthy[0], loop=loop, host='127.0.0.1', registry=registry)
+
+        async def get(path):
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+            response = await reader.read()
+            writer.close()
+            return response.decode()
+
+        async def run():
+            await server.start()
+            try:
+                metrics_response = await get('/metrics')
+                healthy_response = await get('/healthz')
+                healthy[0] = False
+                unhealthy_response = await get('/healthz')
+                missing_response = await get('/nope')
+            finally:
+                server.close()
+            return metrics_response, healthy_response, unhealthy_response, missing_response
+
+        metrics_response, healthy_response, unhealthy_response, missing_response = loop.run_until_complete(run())
+        assert(metrics_response.startswith('HTTP/1.0 200 OK\r\n'))
+        assert(metrics_response.endswith('\r\n\r\n# HELP test_total A counter.\n# TYPE test_total counter\n'
+                                         'test_total 1\n'))
+        assert(healthy_response.startswith('HTTP/1.0 200 OK\r\n'))
+        assert(unhealthy_response.startswith('HTTP/1.0 503 Service Unavailable\r\n'))
+        assert(missing_response.startswith('HTTP/1.0 404 Not Found\r\n'))
@@ -0,0 +1,85 @@
+import asyncio
+import datetime
+
+import pytest
+
+from et_discord_bot.pipeline import probe_as_completed
+
+
+class TestProbeAsCompleted(object):
+
+    def test_bounded_window_and_completion_order(self):
+        loop = asyncio.get_event_loop()
+        in_flight = [0, 0]  # current, max
+        released = {port: loop.create_future() for port in (50, 10, 25, 30, 20)}
+
+        async def probe(ip, port):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            await released[port]
+            in_flight[0] -= 1
+            if port == 30:
+                raise ValueError()
+            return port
+
+        async def hosts():
+            for port in (50, 10, 25, 30, 20):
+                yield ('192.0.2.1', port)
+
+        async def collect():
+            # Probes are released one at a time, each once the previous one's result is in, so the completion order
+            # doesn't depend on timing. 50 is held while later hosts complete.
+            release_order = iter((10, 25, 50, 30, 20))
+            released[next(release_order)].set_result(None)
+            results = []
+            async for item in probe_as_completed(probe, hosts(), concurrency=2):
+                results.append(item)
+                port = next(release_order, None)
+                if port is not None:
+                    released[port].set_result(None)
+            return results
+
+        results = loop.run_until_complete(collect())
+        assert(in_flight[1] == 2)
+        assert([host[1] for host, _, _ in results] == [10, 25, 50, 30, 20])
+        assert(all(result == host[1] for host, result, exception in results if exception is None))
+        assert([type(exception) for _, _, exception in results if exception] == [ValueError])
+
+    def test_deadline_cancels_remaining(self):
+        loop = asyncio.get_event_loop()
+        cancelled = []
+
+        async def probe(ip, port):
+            try:
+                await asyncio.sleep(port / 10)
+            except asyncio.CancelledError:
+                cancelled.append(port)
+                raise
+            return port
+
+        async def collect():
+            return [
+                host[1]
+                async for host, _, _ in probe_as_completed(
+                    probe, [('192.0.2.1', port) for port in (1, 10, 20)], deadline=datetime.timedelta(seconds=0.3)
+                )
+            ]
+
+        assert(loop.run_until_complete(collect()) == [1])
+        assert(sorted(cancelled) == [10, 20])
+
+    def test_source_error_is_raised(self):
+        loop = asyncio.get_event_loop()
+
+        async def probe(ip, port):
+            return port
+
+        async def hosts():
+            yield ('192.0.2.1', 1)
+            raise ConnectionError()
+
+        async def collect():
+            return [item async for item in probe_as_completed(probe, hosts())]
+
+        with pytest.raises(ConnectionError):
+            loop.run_until_complete(collect())
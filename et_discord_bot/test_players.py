@@ -0,0 +1,53 @@
+import types
+
+from et_discord_bot.etwolf_client import ServerInfo
+from et_discord_bot.players import PlayerIndex, PlayerSighting
+
+HOST_A = ('192.0.2.1', 27960)
+HOST_B = ('192.0.2.2', 27960)
+
+
+class TestPlayerIndex(object):
+
+    def test_find(self):
+        index = PlayerIndex()
+        index.update(HOST_A, ServerInfo({}, ['10 50 "^1Fat^7Boy"', '3 80 "skinnyboy"', '0 20 "Bot"']))
+        index.update(HOST_B, ServerInfo({}, ['7 40 "fatboy"', '2 60 "^3Fatal"']))
+
+        assert(index.find('FATBOY') == [
+            PlayerSighting('^1Fat^7Boy', HOST_A, 10, 50),
+            PlayerSighting('fatboy', HOST_B, 7, 40),
+        ])
+        assert([sighting.name for sighting in index.find('fat')] == ['^3Fatal', '^1Fat^7Boy', 'fatboy'])
+        assert([sighting.name for sighting in index.find('boy')] == ['^1Fat^7Boy', 'fatboy', 'skinnyboy'])
+        assert([sighting.name for sighting in index.find('ot')] == ['Bot'])
+        assert(index.find('fat', limit=1) == [PlayerSighting('^3Fatal', HOST_B, 2, 60)])
+        assert(index.find('nobody') == [] and index.find('^7') == [])
+
+    def test_updates_incrementally(self):
+        index = PlayerIndex()
+        index.update(HOST_A, ServerInfo({}, ['10 50 "alice"', '3 80 "bob"']))
+        index.update(HOST_B, ServerInfo({}, ['1 20 "alice"']))
+        index.update(HOST_A, ServerInfo({}, ['12 50 "alice"', '0 30 "carol"']))
+
+        assert(index.find('alice') == [PlayerSighting('alice', HOST_A, 12, 50), PlayerSighting('alice', HOST_B, 1, 20)])
+        assert(index.find('bob') == [])
+        assert(index.find('carol') == [PlayerSighting('carol', HOST_A, 0, 30)])
+
+        index.remove(HOST_A)
+        assert(index.find('alice') == [PlayerSighting('alice', HOST_B, 1, 20)])
+        assert(index.find('aro') == [])
+        assert(len(index) == 1)
+
+    def test_skips_unreadable_players(self):
+        index = PlayerIndex()
+        index.update(HOST_A, ServerInfo({}, ['10 50 "alice"', 'garbage', '3 80 "bob"']))
+        index.update(HOST_B, types.SimpleNamespace(player_lines=('x',), players=[
+            {'name': 'carol', 'score': '1', 'ping': '20'}, {'name': 'dave', 'score': 'x', 'ping': '20'}, {'name': None},
+        ]))
+        assert([sighting.name for sighting in index.find('a')] == ['alice', 'carol'])
+        assert(index.find('bob') == [PlayerSighting('bob', HOST_A, 3, 80)])
+
+        index.update(HOST_B, types.SimpleNamespace(player_lines=None, players=None))  # Not iterable.
+        assert(index.find('carol') == [])
+        assert(len(index) == 2)
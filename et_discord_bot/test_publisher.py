@@ -0,0 +1,56 @@
+import asyncio
+import datetime
+
+from et_discord_bot.publisher import StatusPublisher
+
+
+class TestStatusPublisher(object):
+
+    def _make_publisher(self, loop, published):
+        async def publish(content):
+            published.append(content)
+
+        return StatusPublisher(
+            publish,
+            loop=loop,
+            min_interval=datetime.timedelta(seconds=0.2),
+            keepalive_interval=datetime.timedelta(seconds=10),
+        )
+
+    def test_skips_unchanged_and_coalesces_minor_changes(self):
+        loop = asyncio.get_event_loop()
+        published = []
+        publisher = self._make_publisher(loop, published)
+
+        async def run():
+            publisher.submit('a', significance_key=frozenset())
+            await asyncio.sleep(0.05)
+            publisher.submit('a', significance_key=frozenset())
+            publisher.submit('b', significance_key=frozenset())
+            publisher.submit('c', significance_key=frozenset())
+            await asyncio.sleep(0.05)
+            assert(published == ['a'])
+            await asyncio.sleep(0.3)
+
+        loop.run_until_complete(run())
+        publisher.close()
+
+        assert(published == ['a', 'c'])
+        assert(publisher.skipped == 1)
+        assert(publisher.coalesced == 1)
+
+    def test_publishes_significant_changes_immediately(self):
+        loop = asyncio.get_event_loop()
+        published = []
+        publisher = self._make_publisher(loop, published)
+
+        async def run():
+            publisher.submit('empty', significance_key=frozenset())
+            await asyncio.sleep(0.05)
+            publisher.submit('populated', significance_key=frozenset([('192.0.2.1', 27960)]))
+            await asyncio.sleep(0.05)
+
+        loop.run_until_complete(run())
+        publisher.close()
+
+        assert(published == ['empty', 'populated'])
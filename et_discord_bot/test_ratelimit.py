@@ -0,0 +1,54 @@
+import asyncio
+
+from et_discord_bot.ratelimit import TokenBucketRateLimiter
+
+
+class TestTokenBucketRateLimiter(object):
+
+    def test_fifo_order_and_packet_rate(self):
+        loop = asyncio.get_event_loop()
+        limiter = TokenBucketRateLimiter(bytes_per_second=1024 * 1024, packets_per_second=100, loop=loop)
+        sent = []
+
+        async def send(i):
+            await limiter.acquire(100)
+            sent.append((i, loop.time()))
+
+        async def send_all():
+            tasks = []
+            for i in range(10):
+                tasks.append(loop.create_task(send(i)))
+                await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+
+        start = loop.time()
+        loop.run_until_complete(send_all())
+
+        assert([i for i, _ in sent] == list(range(10)))
+        assert(sent[-1][1] - start >= 9 * 0.01 * 0.9)
+        assert(limiter.sent_packets == 10)
+        assert(limiter.waited_packets == 9)
+        assert(limiter.queue_depth == 0)
+
+    def test_byte_rate_and_priority(self):
+        loop = asyncio.get_event_loop()
+        limiter = TokenBucketRateLimiter(bytes_per_second=1000, packets_per_second=1000, loop=loop, byte_burst=100)
+        sent = []
+
+        async def send(name, priority):
+            await limiter.acquire(100, priority)
+            sent.append(name)
+
+        async def send_all():
+            await limiter.acquire(100)  # Drain the bucket, so the following sends have to queue.
+            tasks = [loop.create_task(send('low', 1))]
+            await asyncio.sleep(0)
+            tasks.append(loop.create_task(send('high', 0)))
+            await asyncio.gather(*tasks)
+
+        start = loop.time()
+        loop.run_until_complete(send_all())
+
+        assert(sent == ['high', 'low'])
+        assert(loop.time() - start >= 0.2 * 0.9)
+        assert(limiter.stats()['sent_bytes'] == 300)
@@ -0,0 +1,36 @@
+import asyncio
+import datetime
+import mock
+import socket
+
+from et_discord_bot.resolver import CachingResolver
+
+
+def addrinfo(address):
+    return [(socket.AF_INET, socket.SOCK_DGRAM, 17, '', (address, 0))]
+
+
+class TestCachingResolver(object):
+
+    def test_caches_and_coalesces_lookups(self):
+        loop = asyncio.get_event_loop()
+        resolver = CachingResolver(loop=loop)
+        with mock.patch.object(loop, 'getaddrinfo', mock.AsyncMock(return_value=addrinfo('192.0.2.1'))) as getaddrinfo:
+            results = loop.run_until_complete(resolver.resolve_all(['example.com', 'example.com', '192.0.2.7']))
+            address = loop.run_until_complete(resolver.resolve('example.com'))
+
+        assert(results == {'example.com': '192.0.2.1', '192.0.2.7': '192.0.2.7'})
+        assert(address == '192.0.2.1')
+        assert(getaddrinfo.call_count == 1)
+
+    def test_serves_stale_address_on_error(self):
+        loop = asyncio.get_event_loop()
+        resolver = CachingResolver(loop=loop, ttl=datetime.timedelta(0))
+        with mock.patch.object(loop, 'getaddrinfo', mock.AsyncMock(return_value=addrinfo('192.0.2.1'))):
+            loop.run_until_complete(resolver.resolve('example.com'))
+        with mock.patch.object(loop, 'getaddrinfo', mock.AsyncMock(side_effect=socket.gaierror('failure'))):
+            address = loop.run_until_complete(resolver.resolve('example.com'))
+            results = loop.run_until_complete(resolver.resolve_all(['unknown.example.com']))
+
+        assert(address == '192.0.2.1')
+        assert(isinstance(results['unknown.example.com'], socket.gaierror))
@@ -0,0 +1,29 @@
+import datetime
+
+from et_discord_bot.rtt import RTTTracker
+
+
+class TestRTTTracker(object):
+
+    def test_unknown_host_uses_initial_timeout(self):
+        rtt = RTTTracker(initial_timeout=datetime.timedelta(seconds=1), max_timeout=datetime.timedelta(seconds=5))
+        assert(rtt.retry_schedule(('192.0.2.1', 27960), 4) == [1, 2, 4, 5])
+
+    def test_timeout_follows_samples(self):
+        rtt = RTTTracker(min_timeout=datetime.timedelta(seconds=0.1))
+        addr = ('192.0.2.1', 27960)
+        for _ in range(50):
+            rtt.sample(addr, 0.05)
+        assert(0.1 <= rtt.timeout(addr) < 0.11)
+
+        rtt.sample(addr, 0.5)
+        assert(rtt.timeout(addr) > 0.3)
+
+    def test_load_items_roundtrip(self):
+        rtt = RTTTracker()
+        rtt.sample(('192.0.2.1', 27960), 0.2)
+        restored = RTTTracker()
+        restored.load(list(rtt.items()))
+        assert(list(restored.items()) == [('192.0.2.1', 27960, 0.2, 0.1)])
+        assert(restored.estimate(('192.0.2.1', 27960)) == (0.2, 0.1))
+        assert(restored.estimate(('192.0.2.2', 27960)) is None)
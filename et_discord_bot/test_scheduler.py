@@ -0,0 +1,41 @@
+import datetime
+
+from et_discord_bot.scheduler import PollScheduler
+
+
+class TestPollScheduler(object):
+
+    def _make_scheduler(self):
+        return PollScheduler(
+            changing_interval=datetime.timedelta(seconds=10),
+            populated_interval=datetime.timedelta(seconds=30),
+            empty_interval=datetime.timedelta(seconds=300),
+        )
+
+    def test_tiers(self):
+        scheduler = self._make_scheduler()
+        empty, populated, changing = ('192.0.2.1', 27960), ('192.0.2.2', 27960), ('192.0.2.3', 27960)
+        scheduler.sync([empty, populated, changing], due_at=lambda host: 0)
+        assert(sorted(scheduler.pop_due(0)) == [empty, populated, changing])
+        assert(scheduler.pop_due(0) == [])
+
+        scheduler.record_players(empty, 0, now=0)
+        scheduler.record_players(populated, 5, now=0)
+        scheduler.record_players(changing, 5, now=0)
+        assert(scheduler.pop_due(30) == [populated, changing])
+
+        scheduler.record_players(populated, 5, now=30)
+        scheduler.record_players(changing, 6, now=30)
+        assert(scheduler.next_due_at() == 40)
+        assert(scheduler.pop_due(60) == [changing, populated])
+        assert(scheduler.next_due_at() == 300)
+
+    def test_sync_removes_hosts(self):
+        scheduler = self._make_scheduler()
+        kept, removed = ('192.0.2.1', 27960), ('192.0.2.2', 27960)
+        scheduler.sync([kept, removed], due_at=lambda host: 10)
+        scheduler.sync([kept], due_at=lambda host: 0)
+
+        assert(removed not in scheduler)
+        assert(scheduler.pop_due(10) == [kept])
+        assert(len(scheduler) == 0)
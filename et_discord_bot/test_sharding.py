@@ -0,0 +1,76 @@
+import asyncio
+import collections
+import mock
+
+from et_discord_bot.etwolf_client import ETClient
+from et_discord_bot.sharding import ConsistentHashRing, ProbeShardPool, _WorkerProtocol
+from et_discord_bot.test_etwolf_client import MockETServerProtocol
+
+
+class TestConsistentHashRing(object):
+
+    def test_balances_and_moves_few_keys(self):
+        keys = [f'192.0.2.{i % 256}:{27960 + i // 256}' for i in range(10000)]
+        ring = ConsistentHashRing(range(4))
+        assignments = {key: ring.node_for(key) for key in keys}
+
+        counts = collections.Counter(assignments.values())
+        assert(set(counts) == {0, 1, 2, 3})
+        assert(min(counts.values()) > 1500)
+
+        # Adding a node only takes keys over from the others.
+        grown_ring = ConsistentHashRing(range(5))
+        moved = [key for key in keys if grown_ring.node_for(key) != assignments[key]]
+        assert(all(grown_ring.node_for(key) == 4 for key in moved))
+        assert(len(moved) < 3000)
+
+
+class TestProbeShardPool(object):
+
+    def test_probes_through_workers(self):
+        loop = asyncio.get_event_loop()
+        ports = (47720, 47721, 47722, 47723)
+        servers = [
+            loop.run_until_complete(
+                loop.create_datagram_endpoint(MockETServerProtocol, local_addr=('127.0.0.1', port))
+            )
+            for port in ports
+        ]
+        pool = ProbeShardPool(2, loop=loop, packets_per_second=1000)
+        pool.rtt.load([('127.0.0.1', ports[0], 0.3, 0.1)])
+        try:
+            loop.run_until_complete(pool.start())
+            host_infos = loop.run_until_complete(asyncio.gather(*[
+                pool.get_server_info('127.0.0.1', port) for port in ports
+            ]))
+            assert(pool.is_healthy())
+        finally:
+            pool.close()
+            for transport, _ in servers:
+                transport.close()
+
+        assert([host_info.hostname_plaintext for host_info in host_infos] == ['examplehost'] * len(ports))
+        # The workers' estimates come back with the results, the loaded one was handed to its worker and updated there.
+        estimates = {port: srtt for _, port, srtt, _ in pool.rtt.items()}
+        assert(set(estimates) == set(ports))
+        assert(0.25 < estimates[ports[0]] < 0.3)
+
+    def test_worker_cancels_abandoned_probes(self):
+        loop = asyncio.get_event_loop()
+        client = ETClient(loop)
+        worker = _WorkerProtocol(client, loop.create_future())
+        worker.transport = mock.Mock()
+        addr = ('127.0.0.1', 47724)  # Nothing listening.
+        worker.message_received(('probe', 0, addr + (None,)))
+        worker.message_received(('probe', 1, addr + (None,)))
+        loop.run_until_complete(asyncio.sleep(0.05))
+
+        # The probe is only cancelled once no request is waiting for it.
+        worker.message_received(('cancel', 0, None))
+        loop.run_until_complete(asyncio.sleep(0.01))
+        assert(addr in client._info_in_flight)
+        worker.message_received(('cancel', 1, None))
+        loop.run_until_complete(asyncio.sleep(0.01))
+        assert(addr not in client._info_in_flight)
+        assert(not worker.transport.write.called)
+        client.close()
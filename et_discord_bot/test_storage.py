@@ -0,0 +1,143 @@
+import asyncio
+import datetime
+import sqlite3
+
+import mock
+
+from et_discord_bot.etwolf_client import ServerInfo
+from et_discord_bot.storage import Database, HostManagerModel, StatusMessageModel
+
+
+class TestHostManagerModel(object):
+
+    def test_save_load(self, tmp_path):
+        loop = asyncio.get_event_loop()
+        db = Database(f'sqlite://{tmp_path / "data.db"}', loop=loop)
+        hosts = HostManagerModel(db)
+
+        hosts.raw = [('192.0.2.1', 27960), ('192.0.2.2', 27960)]
+        loop.run_until_complete(hosts.save())
+        hosts.raw = [('192.0.2.2', 27960), ('192.0.2.3', 27961)]
+        loop.run_until_complete(hosts.save())
+        loop.run_until_complete(hosts.save_rtt([('192.0.2.2', 27960, 0.1, 0.05)]))
+
+        restored = HostManagerModel(db)
+        loop.run_until_complete(restored.load())
+        rtt_rows = loop.run_until_complete(restored.load_rtt())
+        db.close()
+
+        assert(sorted(restored.raw) == [('192.0.2.2', 27960), ('192.0.2.3', 27961)])
+        assert(rtt_rows == [('192.0.2.2', 27960, 0.1, 0.05)])
+
+    def test_migrates_duplicate_hosts(self, tmp_path):
+        db_path = tmp_path / 'data.db'
+        with sqlite3.connect(db_path) as db_conn:
+            db_conn.execute('CREATE TABLE host (id INTEGER PRIMARY KEY, ip TEXT, port INT, active INT)')
+            db_conn.executemany('INSERT INTO host (ip, port, active) VALUES (?, ?, ?)', [
+                ('192.0.2.1', 27960, 1),
+                ('192.0.2.1', 27960, 0),
+            ])
+
+        loop = asyncio.get_event_loop()
+        db = Database(f'sqlite://{db_path}', loop=loop)
+        hosts = HostManagerModel(db)
+        loop.run_until_complete(hosts.load())
+        db.close()
+
+        assert(list(hosts.raw) == [('192.0.2.1', 27960)])
+
+    def test_probe_backoff_and_pruning(self, tmp_path):
+        loop = asyncio.get_event_loop()
+        db = Database(f'sqlite://{tmp_path / "data.db"}', loop=loop)
+        hosts = HostManagerModel(db)
+        alive, dead = ('192.0.2.1', 27960), ('192.0.2.2', 27960)
+        hosts.raw = [alive, dead]
+
+        hosts.record_probe(alive, True, now=1000)
+        hosts.record_probe(dead, False, now=1000)
+        assert(hosts.probe_due(alive, now=1000))
+        assert(not hosts.probe_due(dead, now=1059))
+        assert(hosts.probe_due(dead, now=1060))
+        hosts.record_probe(dead, False, now=1060)
+        assert(not hosts.probe_due(dead, now=1179))
+        assert(hosts.probe_due(dead, now=1180))
+
+        loop.run_until_complete(hosts.save())
+        restored = HostManagerModel(db)
+        loop.run_until_complete(restored.load())
+        assert(not restored.probe_due(dead, now=1179))
+        assert(restored.health[dead].failing_since == 1000)
+
+        assert(restored.prune_dead(now=2000, dead_period=datetime.timedelta(seconds=1500)) == set())
+        assert(restored.prune_dead(now=3000, dead_period=datetime.timedelta(seconds=1500)) == {dead})
+        loop.run_until_complete(restored.save())
+        loop.run_until_complete(restored.load())
+        db.close()
+
+        assert(list(restored.raw) == [alive])
+        assert(list(restored.health) == [alive])
+
+    def test_saves_only_changes(self, tmp_path):
+        loop = asyncio.get_event_loop()
+        db = Database(f'sqlite://{tmp_path / "data.db"}', loop=loop)
+        hosts = HostManagerModel(db)
+        kept, removed, added = ('192.0.2.1', 27960), ('192.0.2.2', 27960), ('192.0.2.3', 27960)
+        hosts.raw = [kept, removed]
+        loop.run_until_complete(hosts.save())
+
+        hosts.raw = [kept, added]
+        with mock.patch.object(HostManagerModel, '_save', side_effect=HostManagerModel._save) as save:
+            loop.run_until_complete(hosts.save())
+            loop.run_until_complete(hosts.save())
+        restored = HostManagerModel(db)
+        loop.run_until_complete(restored.load())
+        db.close()
+
+        (_, rows, deactivated, _), _ = save.call_args_list[0]
+        assert([row[:3] for row in rows] == [(*added, True)])
+        assert(deactivated == [removed])
+        (_, rows, deactivated, _), _ = save.call_args_list[1]
+        assert(rows == [] and deactivated == [])
+        assert(sorted(restored.raw) == [kept, added])
+
+    def test_snapshot_and_status_messages(self, tmp_path):
+        loop = asyncio.get_event_loop()
+        db = Database(f'sqlite://{tmp_path / "data.db"}', loop=loop)
+        hosts = HostManagerModel(db)
+        status_messages = StatusMessageModel(db)
+        host_info = ServerInfo({'hostname': '^1red', 'humans': '1', 'sv_maxclients': '12'}, ['3 50 "player"'])
+        host_info.ip, host_info.port = '192.0.2.1', 27960
+
+        loop.run_until_complete(hosts.save_snapshot([host_info], 1000.0))
+        loop.run_until_complete(status_messages.save(1, 100))
+        loop.run_until_complete(status_messages.save(1, 101))
+        snapshot, saved_at = loop.run_until_complete(hosts.load_snapshot())
+        message_ids = loop.run_until_complete(status_messages.load())
+        db.close()
+
+        assert([(restored.ip, restored.port) for restored in snapshot] == [('192.0.2.1', 27960)])
+        assert(snapshot[0].to_dict() == host_info.to_dict())
+        assert(saved_at == 1000.0)
+        assert(message_ids == {1: 101})
+
+    def test_snapshot_saves_only_changes(self, tmp_path):
+        loop = asyncio.get_event_loop()
+        db = Database(f'sqlite://{tmp_path / "data.db"}', loop=loop)
+        hosts = HostManagerModel(db)
+
+        def host_info(ip, humans):
+            host_info = ServerInfo({'humans': str(humans)})
+            host_info.ip, host_info.port = ip, 27960
+            return host_info
+
+        loop.run_until_complete(hosts.save_snapshot([host_info('192.0.2.1', 1), host_info('192.0.2.2', 2)], 1000.0))
+        with mock.patch.object(HostManagerModel, '_save_snapshot', side_effect=HostManagerModel._save_snapshot) as save:
+            loop.run_until_complete(hosts.save_snapshot([host_info('192.0.2.1', 1), host_info('192.0.2.3', 3)], 1060.0))
+        snapshot, saved_at = loop.run_until_complete(HostManagerModel(db).load_snapshot())
+        db.close()
+
+        (_, rows, removed, _), _ = save.call_args
+        assert([row[:2] for row in rows] == [('192.0.2.3', 27960)])
+        assert(removed == [('192.0.2.2', 27960)])
+        assert(sorted((restored.ip, restored.humans) for restored in snapshot) == [('192.0.2.1', 1), ('192.0.2.3', 3)])
+        assert(saved_at == 1060.0)